@@ -0,0 +1,119 @@
+"""체스 RPG 국면 일괄 분석 도구
+
+국면 표기(Game.to_notation 형식)를 한 줄에 하나씩 파일 또는 표준 입력에서 스트리밍으로 읽어
+여러 프로세스에서 AI 로 분석하고, 국면마다 최선의 수/점수/탐색 깊이/소요 시간을 JSONL 로 씁니다.
+처리 중인 국면 수를 --max-pending 으로 제한하므로 입력 크기와 관계없이 메모리 사용량이 일정합니다.
+빈 줄과 '#' 으로 시작하는 줄은 건너뜁니다.
+
+--trace 를 지정하면 한 프로세스에서 순서대로 분석하며 AI 탐색 기록(Chrome trace JSON, .folded)을 저장합니다.
+
+사용 예:
+    python analyze_positions.py positions.txt -o results.jsonl
+    cat positions.txt | python analyze_positions.py - --workers 4
+    python analyze_positions.py positions.txt -o results.jsonl --trace trace.json
+"""
+import argparse
+import collections
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+import chess_source_code as chess
+
+chess.setup_headless()  # 화면 없이 실행
+
+# 평가 가중치는 국면마다 다시 읽지 않도록 프로세스마다 한 번만 로드 (안내 메시지는 결과와 섞이지 않게 stderr 로)
+with contextlib.redirect_stdout(sys.stderr):
+    EVAL_WEIGHTS = chess.load_eval_weights()
+
+
+def analyze(task, trace=None):
+    line_no, text = task
+    result = {'line': line_no, 'position': text}
+    start = time.perf_counter()
+    try:
+        with chess.quiet():
+            game = chess.Game.from_notation(text, eval_weights=EVAL_WEIGHTS)
+            game.trace = trace
+            random.seed(0)
+            piece_pos, move, score = game.find_best_move(game.turn, noise=0)
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+    except Exception as e:
+        # 예상하지 못한 오류도 이 줄의 오류로만 기록하고 나머지 국면은 계속 분석
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    if move is None:
+        result.update(best_move=None, score=None)
+    else:
+        result.update(best_move=game.move_name(piece_pos, move), score=round(score, 3))
+    result['depth'] = 1  # find_best_move 는 1수 탐색
+    result['time_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def read_positions(stream):
+    for line_no, line in enumerate(stream, 1):
+        text = line.strip()
+        if text and not text.startswith('#'):
+            yield line_no, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="체스 RPG 국면 일괄 분석 (JSONL 출력)")
+    parser.add_argument('input', help="국면 파일 경로 ('-' 이면 표준 입력)")
+    parser.add_argument('-o', '--output', help="결과 JSONL 파일 (기본값: 표준 출력)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-pending', type=int, default=0,
+                        help="동시에 처리 중인 국면 수 상한 (기본값: workers * 4)")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="AI 탐색 기록을 PATH(Chrome trace JSON)와 .folded(flamegraph)로 저장")
+    args = parser.parse_args()
+    if args.trace:
+        try: chess.SearchTrace.folded_path_for(args.trace)
+        except ValueError as e: parser.error(str(e))
+    max_pending = args.max_pending or args.workers * 4
+
+    src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    dst = sys.stdout if args.output is None else open(args.output, 'w', encoding='utf-8')
+    count = 0
+    start = time.time()
+    try:
+        if args.trace:
+            # 탐색 기록은 한 파일에 한 시계로 이어 써야 하므로 작업자 없이 순서대로 분석
+            # (구간 이벤트는 바로 파일에 쓰므로 국면 수가 많아도 메모리 사용량은 일정)
+            trace = chess.SearchTrace(args.trace)
+            try:
+                for task in read_positions(src):
+                    dst.write(json.dumps(analyze(task, trace), ensure_ascii=False) + '\n')
+                    count += 1
+            finally:
+                trace_file, folded_file = trace.close()
+            print(f"trace: {trace_file}, {folded_file}", file=sys.stderr)
+        else:
+            with mp.Pool(args.workers) as pool:
+                # 입력 순서대로 결과를 쓰며, 대기열이 차면 가장 오래된 결과를 기다림
+                pending = collections.deque()
+                for task in read_positions(src):
+                    pending.append(pool.apply_async(analyze, (task,)))
+                    if len(pending) >= max_pending:
+                        dst.write(json.dumps(pending.popleft().get(), ensure_ascii=False) + '\n')
+                        count += 1
+                while pending:
+                    dst.write(json.dumps(pending.popleft().get(), ensure_ascii=False) + '\n')
+                    count += 1
+                pool.close()
+                pool.join()
+    finally:
+        if src is not sys.stdin: src.close()
+        if dst is not sys.stdout: dst.close()
+    print(f"{count} positions, {time.time() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
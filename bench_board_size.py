@@ -0,0 +1,103 @@
+"""보드 크기별 이동 생성/탐색 처리량 벤치마크
+
+보드 면적(rows x cols)이 커질 때 이동 생성, 공격 범위 맵 재계산, AI 탐색(find_best_move)의
+처리량이 어떻게 변하는지 측정합니다. 각 크기마다 자가 대국으로 몇 수 진행한 국면들을 사용합니다.
+
+사용 예:
+    python bench_board_size.py
+    python bench_board_size.py --sizes 8 10 12 16 --positions 10
+"""
+import argparse
+import random
+import time
+
+import chess_source_code as chess
+
+chess.setup_headless()  # 화면 없이 실행
+
+
+def sample_positions(size, count, plies, seed):
+    # size x size 보드에서 plies 수만큼 AI 끼리 둔 국면(Game 객체)들을 만듦
+    games = []
+    with chess.quiet():
+        for i in range(count):
+            random.seed(seed + i)
+            game = chess.Game(None, size, size)
+            for _ in range(plies):
+                if game.winner: break
+                piece_pos, move, _ = game.find_best_move(game.turn)
+                if move is None: break
+                game.apply_move(piece_pos, move)
+            games.append(game)
+    return games
+
+
+def timed(fn, min_time=0.5):
+    # fn 을 min_time 초 이상 반복 실행해 (반복 횟수, 총 시간, fn 반환값 합) 반환
+    runs = 0
+    total = 0
+    start = time.perf_counter()
+    while True:
+        total += fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time: return runs, elapsed, total
+
+
+def bench_size(size, args):
+    games = sample_positions(size, args.positions, args.plies, args.seed)
+
+    def movegen():
+        moves = 0
+        for game in games:
+            for row in game.board:
+                for p in row:
+                    if p: moves += len(game.get_valid_moves(p))
+        return moves
+
+    def rebuild():
+        for game in games:
+            for attack_map in game.attack_maps.values():
+                attack_map.rebuild(game, game.board)
+        return len(games)
+
+    # find_best_move 가 시뮬레이션/평가하는 후보 수 = 이동 가능한 수의 합
+    candidates = sum(len(game.get_valid_moves(p)) for game in games for row in game.board for p in row
+                     if p and p.color == game.turn)
+
+    def search():
+        with chess.quiet():
+            for game in games:
+                game.find_best_move(game.turn)
+        return candidates
+
+    runs, elapsed, moves = timed(movegen, args.min_time)
+    gen_rate = moves / elapsed
+    gen_us = elapsed / (runs * len(games)) * 1e6
+    runs, elapsed, _ = timed(rebuild, args.min_time)
+    rebuild_us = elapsed / (runs * len(games)) * 1e6
+    runs, elapsed, nodes = timed(search, args.min_time)
+    search_rate = nodes / elapsed
+    search_ms = elapsed / (runs * len(games)) * 1e3
+    return gen_rate, gen_us, rebuild_us, search_rate, search_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보드 크기별 이동 생성/탐색 처리량 벤치마크")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 10, 12, 16])
+    parser.add_argument('--positions', type=int, default=5, help="크기별 측정 국면 수")
+    parser.add_argument('--plies', type=int, default=10, help="측정 국면까지 진행할 수")
+    parser.add_argument('--min-time', type=float, default=1.0, help="항목별 최소 측정 시간(초)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'size':>7} {'area':>5} | {'movegen moves/s':>16} {'us/position':>12} | "
+          f"{'attackmap us':>12} | {'search nodes/s':>15} {'ms/move':>9}")
+    for size in args.sizes:
+        gen_rate, gen_us, rebuild_us, search_rate, search_ms = bench_size(size, args)
+        print(f"{size:>3}x{size:<3} {size * size:>5} | {gen_rate:>16,.0f} {gen_us:>12,.1f} | "
+              f"{rebuild_us:>12,.1f} | {search_rate:>15,.0f} {search_ms:>9,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""MCTS 엔진 벤치마크 및 minimax 와의 대국
+
+1. 플레이아웃 처리량: 자가 대국으로 몇 수 진행한 국면들에서 MCTS.playout 을 반복 실행해
+   초당 플레이아웃 수와 플레이아웃당 평균 수를 측정합니다.
+2. 기력 비교: MCTS(한 수당 --time ms 또는 --iterations 회) 와 1수 minimax(find_best_move) 를
+   색을 번갈아 가며 대국시켜 승/무/패와 점수율, 추정 Elo 차이를 출력합니다.
+   --max-plies 수 안에 킹을 잡지 못하면 무승부로 처리합니다.
+
+사용 예:
+    python bench_mcts.py
+    python bench_mcts.py --games 20 --time 500 --size 10
+"""
+import argparse
+import math
+import random
+import time
+
+import chess_source_code as chess
+from bench_board_size import sample_positions
+
+chess.setup_headless()  # 화면 없이 실행
+
+
+def bench_playouts(args):
+    # 자가 대국으로 만든 국면들에서 플레이아웃을 반복해 (초당 플레이아웃 수, 플레이아웃당 평균 수) 반환
+    games = sample_positions(args.size, args.positions, args.plies, args.seed)
+    positions = [game for game in games if game.winner is None]
+
+    plies = 0
+    playouts = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.min_time:
+        for game in positions:
+            engine = chess.MCTS(game, max_playout=args.max_playout)
+            engine.playout(chess.clone_board(game.board), game.turn)
+            plies += engine.playout_plies
+            playouts += 1
+    elapsed = time.perf_counter() - start
+    return playouts / elapsed, plies / playouts
+
+
+def play_match_game(seed, mcts_color, args):
+    # MCTS 대 minimax 한 판. 반환: (승리한 진영 또는 None, 둔 수, MCTS 반복 횟수 합, MCTS 시간 합)
+    random.seed(seed)
+    game = chess.Game(None, args.size, args.size)
+    engine = chess.MCTS(game, iterations=args.iterations, time_limit=args.time, max_playout=args.max_playout)
+    iterations = 0
+    search_time = 0
+    plies = 0
+    with chess.quiet():
+        while plies < args.max_plies and game.winner is None:
+            plies += 1
+            if game.turn == mcts_color:
+                piece_pos, move, _ = engine.search(game.turn)
+                iterations += engine.last_stats['iterations']
+                search_time += engine.last_stats['time_ms']
+            else:
+                piece_pos, move, _ = game.find_best_move(game.turn)
+            if move is None:
+                game.change_turn()
+                continue
+            game.apply_move(piece_pos, move)
+    return game.winner, plies, iterations, search_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCTS 플레이아웃 처리량 및 minimax 대비 기력 측정")
+    parser.add_argument('--size', type=int, default=8, help="보드 크기 (size x size)")
+    parser.add_argument('--positions', type=int, default=5, help="플레이아웃 측정 국면 수")
+    parser.add_argument('--plies', type=int, default=10, help="측정 국면까지 진행할 수")
+    parser.add_argument('--min-time', type=float, default=2.0, help="플레이아웃 최소 측정 시간(초)")
+    parser.add_argument('--games', type=int, default=10, help="minimax 와의 대국 수 (0 이면 생략)")
+    parser.add_argument('--time', type=int, default=1000, help="MCTS 한 수당 탐색 시간(ms)")
+    parser.add_argument('--iterations', type=int, default=5000, help="MCTS 한 수당 최대 반복 횟수")
+    parser.add_argument('--max-playout', type=int, default=8, help="플레이아웃 최대 수 (넘으면 평가 함수로 승률 추정)")
+    parser.add_argument('--max-plies', type=int, default=200, help="이 수를 넘기면 무승부")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rate, length = bench_playouts(args)
+    print(f"playouts: {rate:,.0f}/s  (avg {length:.1f} plies/playout, {rate * length:,.0f} plies/s)")
+    if args.games <= 0: return
+
+    results = {'win': 0, 'draw': 0, 'loss': 0}
+    total_iterations = 0
+    total_time = 0
+    for i in range(args.games):
+        mcts_color = 'white' if i % 2 == 0 else 'black'
+        winner, plies, iterations, search_time = play_match_game(args.seed + i, mcts_color, args)
+        outcome = 'draw' if winner is None else 'win' if winner == mcts_color else 'loss'
+        results[outcome] += 1
+        total_iterations += iterations
+        total_time += search_time
+        print(f"game {i + 1:>3}: MCTS {mcts_color:<5} -> {outcome:<4} ({plies} plies)")
+
+    score = (results['win'] + 0.5 * results['draw']) / args.games
+    elo = 400 * math.log10(score / (1 - score)) if 0 < score < 1 else float('inf') if score else -float('inf')
+    print(f"MCTS vs minimax: +{results['win']} ={results['draw']} -{results['loss']}  "
+          f"score {score:.1%}  Elo diff {elo:+.0f}")
+    if total_time:
+        print(f"MCTS search: {total_iterations / (total_time / 1000):,.0f} iterations/s")
+
+
+if __name__ == "__main__":
+    main()
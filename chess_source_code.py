@@ -1,9 +1,12 @@
-﻿import pygame
-import copy
+﻿import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1') # pygame 환영 메시지 숨김 (분석 도구의 표준 출력 결과와 섞이지 않게)
+import pygame
 import random
 import sys
-import os
 import math # 방향 벡터 계산을 위해 math 모듈 추가
+import json
+import time
+import contextlib
 
 # --- Pygame 초기화 ---
 pygame.init()
@@ -12,7 +15,8 @@ pygame.init()
 BOARD_SIZE = 720 # 600 * 1.2 = 720
 DISPLAY_WIDTH = BOARD_SIZE + 200 # 쿨타임 표시를 위해 오른쪽 200px 추가
 DISPLAY_HEIGHT = BOARD_SIZE
-ROWS, COLS = 8, 8
+ROWS, COLS = 8, 8 # 기본 보드 크기 (Game(win, rows, cols) 로 10x10, 16x16 등 변경 가능)
+MIN_ROWS, MIN_COLS = 4, 2 # 최소 보드 크기 (양쪽 기물 줄 + 폰 줄, 퀸과 킹)
 SQUARE_SIZE = BOARD_SIZE // COLS # 720 / 8 = 90
 
 # 색상 (RGB)
@@ -22,13 +26,68 @@ RED = (200, 50, 50)
 GREEN = (50, 200, 50)
 BLUE = (50, 50, 200)
 
+# AI 차례를 알리는 타이머 이벤트
+AI_MOVE_EVENT = pygame.USEREVENT + 1
+
 # --- 사용자 지정 배경 이미지 경로 ---
 IMAGE_PATH = os.path.join('assets', 'start_bg.png') 
 
+# --- AI 평가 가중치 (tune_weights.py 로 튜닝한 파일이 있으면 시작할 때 불러옴) ---
+EVAL_WEIGHTS_PATH = 'eval_weights.json'
+DEFAULT_EVAL_WEIGHTS = {
+    'hp': 1, 'ap': 2,  # 기물 가치 = HP + AP*2 + 기물별 보너스
+    'Pawn': 0, 'Knight': 0, 'Bishop': 0, 'Rook': 0, 'Queen': 15, 'King': 100,
+    'threat': 0.5,  # 상대의 다음 공격에 죽을 수 있는 기물의 가치 감소 비율
+    'mobility': 0.1,  # 공격 가능한 칸 수 차이
+}
+EVAL_FEATURE_KEYS = ['hp', 'ap', 'Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King']
+
+def load_eval_weights(path=EVAL_WEIGHTS_PATH):
+    weights = dict(DEFAULT_EVAL_WEIGHTS)
+    try:
+        with open(path, encoding='utf-8') as f:
+            loaded = json.load(f)
+        # 알려진 키에 숫자 값만 있는 JSON 객체여야 함 (bool 은 int 이지만 가중치로 쓰지 않음)
+        if not isinstance(loaded, dict):
+            raise ValueError("JSON 객체가 아닙니다")
+        for key, value in loaded.items():
+            if key not in DEFAULT_EVAL_WEIGHTS:
+                raise ValueError(f"알 수 없는 키 {key!r}")
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{key!r} 값이 유한한 숫자가 아닙니다: {value!r}")
+        weights.update(loaded)
+        print(f"평가 가중치 로드: {path}")
+    except FileNotFoundError:
+        pass
+    except (ValueError, OSError) as e:
+        print(f"Warning: 평가 가중치 로드 실패 - {path} ({e}). 기본값을 사용합니다.")
+    return weights
+
+# --- 화면 없이 실행 (튜닝/벤치마크/분석 도구용) ---
+def setup_headless():
+    # 더미 비디오/오디오 드라이버로 pygame 을 다시 초기화하고 기물 이미지는 불러오지 않음
+    # SDL 이 SIGTERM 을 가로채면 multiprocessing 작업자 프로세스가 종료되지 않으므로 신호 처리기도 끔
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+    pygame.quit()
+    pygame.init()
+    Piece.LOAD_IMAGES = False
+
+@contextlib.contextmanager
+def quiet():
+    # 게임 로직이 출력하는 메시지(전투, 차례 등)를 버림
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
 # --- 기물 클래스 ---
 class Piece:
     # 12개의 기물 이미지를 메모리에 캐시하기 위한 클래스 변수
     IMAGE_CACHE = {} 
+    # 화면 없이 실행하는 도구(튜닝/분석)에서는 False 로 설정해 이미지 로드를 건너뜀
+    LOAD_IMAGES = True
+    # 이미지 파일 이름과 국면 표기법에 쓰는 기물 기호
+    SYMBOLS = {'Pawn':'P', 'Rook':'R', 'Knight':'N', 'Bishop':'B', 'Queen':'Q', 'King':'K'}
 
     def __init__(self, name, color, row, col):
         self.name = name
@@ -57,23 +116,21 @@ class Piece:
             self.special_cooldown_max = 0
             self.special_cooldown = 0
         
-        # 2. 이미지 로드 및 설정 (이미지 캐싱)
-        symbol = {'Pawn':'P', 'Rook':'R', 'Knight':'N', 'Bishop':'B', 'Queen':'Q', 'King':'K'}[name]
+        # 2. 이미지 키 설정 (이미지는 처음 그릴 때 칸 크기별로 로드해 캐싱)
         prefix = 'w' if color == 'white' else 'b'
-        self.image_key = f'{prefix}{symbol}'
-        
-        if self.image_key not in Piece.IMAGE_CACHE:
+        self.image_key = f'{prefix}{Piece.SYMBOLS[name]}'
+
+    def get_image(self, size=SQUARE_SIZE):
+        key = (self.image_key, size)
+        if Piece.LOAD_IMAGES and key not in Piece.IMAGE_CACHE:
             filename = os.path.join('assets', 'pieces', f'{self.image_key}.png')
             try:
                 original_image = pygame.image.load(filename).convert_alpha()
-                Piece.IMAGE_CACHE[self.image_key] = pygame.transform.scale(original_image, (SQUARE_SIZE, SQUARE_SIZE))
+                Piece.IMAGE_CACHE[key] = pygame.transform.scale(original_image, (size, size))
             except pygame.error as e:
                 print(f"이미지 로드 실패: {filename} - {e}. 대체 이미지를 사용합니다.")
-                Piece.IMAGE_CACHE[self.image_key] = None
-
-    @property
-    def image(self):
-        return Piece.IMAGE_CACHE.get(self.image_key)
+                Piece.IMAGE_CACHE[key] = None
+        return Piece.IMAGE_CACHE.get(key)
 
     @property
     def ap(self):
@@ -81,37 +138,45 @@ class Piece:
             return self.base_ap + 1
         return self.base_ap
 
-    def draw(self, win):
-        x = self.col * SQUARE_SIZE
-        y = self.row * SQUARE_SIZE
+    @property
+    def attack_damage(self):
+        # 공격 한 번의 데미지 (데미지 감소 적용 전). 나이트는 +3
+        # 공격 범위 맵, MCTS 플레이아웃 정책, apply_rules 가 모두 이 값을 사용
+        return self.ap + (3 if self.name == 'Knight' else 0)
+
+    def draw(self, win, square_size=SQUARE_SIZE):
+        x = self.col * square_size
+        y = self.row * square_size
         
-        center_x = self.col * SQUARE_SIZE + SQUARE_SIZE // 2
-        center_y = self.row * SQUARE_SIZE + SQUARE_SIZE // 2
+        center_x = self.col * square_size + square_size // 2
+        center_y = self.row * square_size + square_size // 2
 
         # 1. 이미지 그리기
-        if self.image:
-            win.blit(self.image, (x, y))
+        image = self.get_image(square_size)
+        if image:
+            win.blit(image, (x, y))
         else:
             # 이미지 로드 실패 시 대체 원형 표시
             color = (255, 255, 255) if self.color == 'white' else (50, 50, 50)
-            pygame.draw.circle(win, color, (center_x, center_y), SQUARE_SIZE // 2 - 10)
+            pygame.draw.circle(win, color, (center_x, center_y), square_size // 2 - 10)
             font = pygame.font.SysFont('arial', 12, bold=True)
             text_color = (0,0,0) if self.color == 'white' else (255,255,255)
             text = font.render(self.name[:2], True, text_color)
             win.blit(text, (center_x-10, center_y-10))
 
-        # 2. RPG 스탯 (HP/AP) 표시
-        stat_font = pygame.font.SysFont('arial', 20, bold=True)
+        # 2. RPG 스탯 (HP/AP) 표시 (칸 크기에 비례, 90px 칸에서 20pt)
+        font_size = max(10, square_size * 2 // 9)
+        stat_font = pygame.font.SysFont('arial', font_size, bold=True)
         
         # HP (GREEN)
         hp_text = stat_font.render(str(self.hp), True, GREEN)
-        hp_x = self.col * SQUARE_SIZE + 5
-        hp_y = (self.row + 1) * SQUARE_SIZE - 25
+        hp_x = self.col * square_size + 5
+        hp_y = (self.row + 1) * square_size - font_size - 5
         win.blit(hp_text, (hp_x, hp_y))
         
         # AP (RED)
         ap_text = stat_font.render(str(self.ap), True, RED)
-        ap_rect = ap_text.get_rect(topright=((self.col + 1) * SQUARE_SIZE - 5, (self.row + 1) * SQUARE_SIZE - 25))
+        ap_rect = ap_text.get_rect(topright=((self.col + 1) * square_size - 5, (self.row + 1) * square_size - font_size - 5))
         win.blit(ap_text, ap_rect)
 
     def move(self, row, col):
@@ -119,141 +184,769 @@ class Piece:
         self.col = col
         self.dmg_reduction = 0
 
+    def clone(self):
+        # 스탯만 복사한 새 기물 (copy.deepcopy 보다 훨씬 빠름, 이미지는 클래스 캐시를 공유)
+        p = Piece.__new__(Piece)
+        p.__dict__.update(self.__dict__)
+        return p
+
+
+def clone_board(board):
+    return [[p.clone() if p else None for p in row] for row in board]
+
+# --- 보드 크기별 이동 표 ---
+class BoardGeometry:
+    """보드 크기(rows x cols)별로 미리 계산한 이동 표입니다. 크기마다 한 번만 만들어 공유합니다.
+
+    steps[name][r][c]: 나이트/킹이 갈 수 있는 칸, rays[name][r][c]: 슬라이딩 기물의 방향별 광선,
+    pawn_attacks[color][r][c]: 폰의 대각선 공격 칸, neighbors[r][c]: 자신을 포함한 3x3 칸
+    """
+    _CACHE = {}
+    DIRECTIONS = {
+        'Rook': [(0,1), (0,-1), (1,0), (-1,0)],
+        'Bishop': [(1,1), (1,-1), (-1,1), (-1,-1)],
+        'Queen': [(0,1), (0,-1), (1,0), (-1,0), (1,1), (1,-1), (-1,1), (-1,-1)],
+    }
+    OFFSETS = {
+        'Knight': [(-2,-1), (-2,1), (-1,-2), (-1,2), (1,-2), (1,2), (2,-1), (2,1)],
+        'King': [(dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if dr or dc],
+    }
+
+    @classmethod
+    def get(cls, rows, cols):
+        if (rows, cols) not in cls._CACHE:
+            cls._CACHE[(rows, cols)] = cls(rows, cols)
+        return cls._CACHE[(rows, cols)]
+
+    def __init__(self, rows, cols):
+        self.rows, self.cols = rows, cols
+        self.pawn_start = {'white': rows - 2, 'black': 1}
+
+        def table(fn):
+            return [[fn(r, c) for c in range(cols)] for r in range(rows)]
+
+        def inside(r, c):
+            return 0 <= r < rows and 0 <= c < cols
+
+        def ray(r, c, dr, dc):
+            squares = []
+            r, c = r + dr, c + dc
+            while inside(r, c):
+                squares.append((r, c))
+                r, c = r + dr, c + dc
+            return tuple(squares)
+
+        self.steps = {name: table(lambda r, c, offs=offs: tuple((r+dr, c+dc) for dr, dc in offs if inside(r+dr, c+dc)))
+                      for name, offs in BoardGeometry.OFFSETS.items()}
+        self.rays = {name: table(lambda r, c, dirs=dirs: tuple(filter(None, (ray(r, c, dr, dc) for dr, dc in dirs))))
+                     for name, dirs in BoardGeometry.DIRECTIONS.items()}
+        self.pawn_attacks = {color: table(lambda r, c, dr=dr: tuple((r+dr, c+dc) for dc in (-1, 1) if inside(r+dr, c+dc)))
+                             for color, dr in (('white', -1), ('black', 1))}
+        self.neighbors = table(lambda r, c: tuple((nr, nc) for nr in range(r-1, r+2) for nc in range(c-1, c+2) if inside(nr, nc)))
+
+    def inside(self, r, c):
+        return 0 <= r < self.rows and 0 <= c < self.cols
+
+    def back_rank(self):
+        # 가운데에 퀸과 킹, 양 끝에서 안쪽으로 룩-나이트-비숍 순서 반복 (8칸이면 표준 배치)
+        names = [None] * self.cols
+        king = self.cols // 2
+        names[king - 1], names[king] = 'Queen', 'King'
+        cycle = ['Rook', 'Knight', 'Bishop']
+        for i in range(king - 1):
+            names[i] = cycle[i % 3]
+        for i in range(self.cols - king - 1):
+            names[self.cols - 1 - i] = cycle[i % 3]
+        return names
+
+# --- 진영별 공격 범위 맵 (증분 갱신) ---
+class AttackMap:
+    """한 진영이 각 칸을 공격할 수 있는 기물과 그 기물의 잠재 데미지를 관리합니다.
+
+    기물 위치 (r, c) 를 키로 사용하므로 보드를 deepcopy 해도 그대로 복사해 쓸 수 있습니다.
+    """
+    SLIDERS = ('Rook', 'Bishop', 'Queen')
+
+    def __init__(self, color, rows=ROWS, cols=COLS):
+        self.color = color
+        self.rows, self.cols = rows, cols
+        self.sources = {}  # 공격자 위치 -> (공격 칸 리스트, 슬라이딩 여부)
+        self.hits = [[{} for _ in range(cols)] for _ in range(rows)]  # 칸별 {공격자 위치: 잠재 데미지}
+        self.mobility = 0  # 공격 가능한 칸 수의 합 (기동성 특징)
+
+    def copy(self):
+        new = AttackMap.__new__(AttackMap)
+        new.color = self.color
+        new.rows, new.cols = self.rows, self.cols
+        new.sources = dict(self.sources)
+        new.hits = [[dict(h) for h in row] for row in self.hits]
+        new.mobility = self.mobility
+        return new
+
+    def _add_source(self, game, board, r, c):
+        piece = board[r][c]
+        squares = game.get_attack_squares(piece, board, r, c)
+        dmg = piece.attack_damage
+        self.sources[(r, c)] = (squares, piece.name in AttackMap.SLIDERS)
+        for tr, tc in squares:
+            self.hits[tr][tc][(r, c)] = dmg
+        self.mobility += len(squares)
+
+    def _remove_source(self, src):
+        squares, _ = self.sources.pop(src)
+        for tr, tc in squares:
+            del self.hits[tr][tc][src]
+        self.mobility -= len(squares)
+
+    def rebuild(self, game, board):
+        self.__init__(self.color, game.rows, game.cols)
+        for r in range(game.rows):
+            for c in range(game.cols):
+                p = board[r][c]
+                if p and p.color == self.color:
+                    self._add_source(game, board, r, c)
+
+    def update(self, game, board, changed):
+        # 점유 상태가 바뀐 칸(changed)에 있던 기물과, 그 칸을 지나는 슬라이딩 기물만 다시 계산
+        changed = set(changed)
+        stale = [src for src, (squares, slider) in self.sources.items()
+                 if src in changed or (slider and not changed.isdisjoint(squares))]
+        for src in stale:
+            self._remove_source(src)
+        for r, c in changed.union(stale):
+            p = board[r][c]
+            if p and p.color == self.color and (r, c) not in self.sources:
+                self._add_source(game, board, r, c)
+
+    def max_hit(self, r, c, dmg_reduction=0):
+        # (r, c) 칸의 기물이 상대의 다음 공격 한 번에 받을 수 있는 최대 실제 데미지 (데미지 감소 반영)
+        # 한 턴에 한 번만 공격하므로 치명 여부는 여러 공격의 합이 아니라 이 값으로 판정
+        hits = self.hits[r][c]
+        if not hits: return 0
+        return max(0, max(hits.values()) - dmg_reduction)
+
+    def moves_from(self, board, r, c):
+        # 폰을 제외한 기물의 이동 가능 칸 = 공격 칸 중 아군이 없는 칸
+        squares = self.sources[(r, c)][0]
+        return [(tr, tc) for tr, tc in squares
+                if board[tr][tc] is None or board[tr][tc].color != self.color]
+
+# --- AI 탐색 기록 (Chrome trace-event JSON / flamegraph collapsed-stack 내보내기) ---
+class SearchTrace:
+    """Game.trace 에 넣으면 find_best_move 와 MCTS.search 가 구간별 시간과 수마다의 탐색 요약
+    (깊이별 시간, 최선 수순, 후보 수별 점수, 가지치기/치환표 사용량)을 기록합니다.
+    구간 이벤트는 메모리에 모으지 않고 path 의 Chrome trace JSON(chrome://tracing / Perfetto)에 바로 이어 쓰므로
+    긴 일괄 분석에서도 메모리 사용량이 일정합니다. close() 는 JSON 을 마무리하고
+    flamegraph.pl / speedscope 용 .folded 파일(구간 경로별 시간 합)을 씁니다."""
+    def __init__(self, path):
+        self.path = path
+        self.folded_path = self.folded_path_for(path)
+        self.origin = time.perf_counter()
+        self.stack = []      # 열린 구간: [이름, 하위 구간 시간 합(us)]
+        self.folded = {}     # 'find_best_move;depth 1;move;simulate' -> 자기 시간 합 (us)
+        self.decisions = 0   # 기록한 수의 개수 (탐색 요약은 바깥 구간 이벤트의 args 로 저장)
+        self.file = open(path, 'w', encoding='utf-8')
+        meta = {'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': 'Chess RPG AI'}}
+        self.file.write('{"displayTimeUnit": "ms", "traceEvents": [\n' + json.dumps(meta))
+
+    @staticmethod
+    def folded_path_for(path):
+        # path 의 확장자를 .folded 로 바꾼 경로 (path 가 이미 .folded 이면 JSON 을 덮어쓰게 되므로 거부)
+        root, ext = os.path.splitext(path)
+        if ext.lower() == '.folded':
+            raise ValueError(f"탐색 기록 경로는 .folded 가 아닌 확장자여야 합니다 (예: trace.json): {path}")
+        return root + '.folded'
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        # name 구간의 시간을 기록. with ... as args 로 받은 dict 에 넣은 값은 이벤트의 args 로 저장됨
+        frame = [name, 0.0]
+        self.stack.append(frame)
+        begin = time.perf_counter()
+        try:
+            yield args
+        finally:
+            dur = (time.perf_counter() - begin) * 1e6
+            self.stack.pop()
+            self.add_time(name, dur, dur - frame[1])
+            event = {'name': name, 'cat': 'search', 'ph': 'X', 'pid': 1, 'tid': 1,
+                     'ts': round((begin - self.origin) * 1e6, 3), 'dur': round(dur, 3), 'args': args}
+            self.file.write(',\n' + json.dumps(event, ensure_ascii=False))
+
+    def add_time(self, name, dur, self_time=None):
+        # 현재 구간 아래 name 프레임에 시간을 더함. MCTS 반복처럼 너무 잦은 구간은 이벤트 없이 이것만 사용
+        key = ';'.join([frame[0] for frame in self.stack] + [name])
+        self.folded[key] = self.folded.get(key, 0.0) + (dur if self_time is None else self_time)
+        if self.stack: self.stack[-1][1] += dur
+
+    def to_collapsed(self):
+        # 한 줄에 "프레임;프레임;... 자기 시간(us)"
+        return ''.join(f'{stack} {round(us)}\n' for stack, us in sorted(self.folded.items()) if round(us) > 0)
+
+    def close(self):
+        # JSON 을 닫고 .folded 파일을 씀. 반환: (JSON 경로, .folded 경로)
+        if not self.file.closed:
+            self.file.write('\n]}\n')
+            self.file.close()
+            with open(self.folded_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_collapsed())
+        return self.path, self.folded_path
+
+
+NULL_SPAN = contextlib.nullcontext()
+
+def null_span(name, **args):
+    # 탐색 기록을 끈 경우의 span (아무것도 기록하지 않음)
+    return NULL_SPAN
+
+
+# --- 몬테카를로 트리 탐색 (UCT) ---
+class MCTSNode:
+    __slots__ = ('move', 'parent', 'color', 'winner', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, parent, color, winner=None):
+        self.move = move          # 부모 국면에서 이 노드로 오는 수 ((r, c), (nr, nc))
+        self.parent = parent
+        self.color = color        # 이 수를 둔 진영 (wins 는 이 진영 관점의 승점 합)
+        self.winner = winner      # 이 수로 킹을 잡았으면 승리한 진영 (종료 노드)
+        self.children = []
+        self.untried = None       # 아직 확장하지 않은 수 (처음 도달했을 때 생성)
+        self.visits = 0
+        self.wins = 0.0
+
+    def uct(self, log_parent, exploration):
+        return self.wins / self.visits + exploration * math.sqrt(log_parent / self.visits)
+
+
+class MCTS:
+    # 정적 평가 대신 실제 규칙(Game.apply_rules)으로 끝까지(또는 max_playout 수까지) 둬 보고 승률로 수를 고름
+    # 탐색 예산: 반복(=플레이아웃) 횟수 iterations 와 시간 time_limit(ms) 중 먼저 닿는 쪽
+    # 둔 수와 상대의 응수가 트리에 있으면 다음 차례에 그 하위 트리를 그대로 재사용
+    def __init__(self, game, iterations=5000, time_limit=1000, exploration=1.4,
+                 max_playout=8, greedy=0.5, eval_scale=0.05):
+        self.game = game
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_playout = max_playout  # 플레이아웃 최대 수 (넘으면 evaluate_board 로 승률 추정)
+        self.greedy = greedy            # 플레이아웃에서 잡을 수 있는 기물을 우선 잡을 확률
+        self.eval_scale = eval_scale    # 평가 점수 -> 승률 변환 (로지스틱) 기울기
+        self.root = None
+        self.root_board = None
+        self.root_key = None
+        self.playout_plies = 0  # 플레이아웃에서 둔 수의 누적 합 (벤치마크용)
+        self.last_stats = {}
+
+    def legal_moves(self, board, color):
+        get_valid_moves = self.game.get_valid_moves
+        return [((p.row, p.col), move) for row in board for p in row if p and p.color == color
+                for move in get_valid_moves(p, board)]
+
+    def search(self, color):
+        # 현재 게임 국면에서 color 진영의 (기물 위치, 이동, 예상 승률) 반환
+        game = self.game
+        trace = game.trace
+        span = trace.span if trace else null_span
+        start = time.perf_counter()
+        deadline = start + self.time_limit / 1000
+        with span('mcts.search', color=color) as info:
+            with span('reuse_tree'):
+                reused = self._reuse_tree(color)
+            root = self.root
+            iterations = 0
+            while iterations < self.iterations and (iterations == 0 or time.perf_counter() < deadline):
+                self._iterate(trace)
+                iterations += 1
+            self.last_stats = {'iterations': iterations, 'reused': reused, 'visits': root.visits,
+                               'time_ms': (time.perf_counter() - start) * 1000}
+
+            if not root.children:
+                return None, None, 0.0
+            best = max(root.children, key=lambda child: child.visits)
+
+            if trace:
+                # MCTS 는 깊이 우선 탐색이 아니므로 깊이별 시간 대신 반복 횟수와 방문 수를 기록
+                ranked = sorted(root.children, key=lambda child: -child.visits)
+                summary = {'engine': 'mcts', 'color': color, 'ply': game.history.cursor,
+                           'best': game.move_name(*best.move), 'win_rate': round(best.wins / best.visits, 3),
+                           'pv': self.principal_variation(),
+                           'iterations': iterations, 'reused_visits': reused,
+                           'root_moves': [{'move': game.move_name(*child.move), 'visits': child.visits,
+                                           'win_rate': round(child.wins / child.visits, 3)} for child in ranked]}
+                info.update(summary)
+                trace.decisions += 1
+
+        # 고른 수를 둔 국면을 새 루트로 (상대의 응수는 다음 search 에서 찾음)
+        board = clone_board(self.root_board)
+        game.apply_rules(board, *best.move)
+        best.parent = None
+        self.root = best
+        self.root_board = board
+        self.root_key = game.to_notation(board, 'white' if color == 'black' else 'black')
+        return best.move[0], best.move[1], best.wins / best.visits
+
+    def _reuse_tree(self, color):
+        # 이전 트리에서 현재 국면에 해당하는 노드를 찾아 루트로 삼음. 재사용한 방문 횟수 반환
+        game = self.game
+        key = game.to_notation()
+        if self.root is not None and self.root_key != key:
+            for child in self.root.children:
+                board = clone_board(self.root_board)
+                game.apply_rules(board, *child.move)
+                if child.winner is None and game.to_notation(board, color) == key:
+                    child.parent = None
+                    self.root = child
+                    self.root_board = board
+                    self.root_key = key
+                    break
+        if self.root is None or self.root_key != key:
+            self.root = MCTSNode(None, None, 'white' if color == 'black' else 'black')
+            self.root_board = clone_board(game.board)
+            self.root_key = key
+        return self.root.visits
+
+    def principal_variation(self, max_length=20):
+        # 루트에서 방문 수가 가장 많은 자식을 따라간 수순 (칸 이름 표기)
+        game = self.game
+        node = self.root
+        line = []
+        while node.children and len(line) < max_length:
+            node = max(node.children, key=lambda child: child.visits)
+            line.append(game.move_name(*node.move))
+        return line
+
+    def _iterate(self, trace=None):
+        # trace 가 있으면 단계별 시간을 이벤트 없이 합산 (반복마다 이벤트를 남기기에는 너무 잦음)
+        if trace: t0 = time.perf_counter()
+        game = self.game
+        board = clone_board(self.root_board)
+        node = self.root
+        if trace: t1 = time.perf_counter()
+
+        # 1. 선택: 모든 수를 확장한 노드에서는 UCT 값이 가장 큰 자식으로 내려감
+        while node.winner is None and node.untried == [] and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: child.uct(log_visits, self.exploration))
+            game.apply_rules(board, *node.move)
+        if trace: t2 = time.perf_counter()
+
+        # 2. 확장: 아직 두지 않은 수 하나를 골라 자식 노드 추가
+        if node.winner is None:
+            color = 'white' if node.color == 'black' else 'black'
+            if node.untried is None:
+                node.untried = self.legal_moves(board, color)
+            if node.untried:
+                move = node.untried.pop(random.randrange(len(node.untried)))
+                child = MCTSNode(move, node, color, game.apply_rules(board, *move))
+                node.children.append(child)
+                node = child
+        if trace: t3 = time.perf_counter()
+
+        # 3. 플레이아웃 (결과는 백색의 승점: 1 승, 0 패)
+        if node.winner is not None:
+            result = 1.0 if node.winner == 'white' else 0.0
+        else:
+            result = self.playout(board, 'white' if node.color == 'black' else 'black')
+        if trace: t4 = time.perf_counter()
+
+        # 4. 역전파
+        while node is not None:
+            node.visits += 1
+            node.wins += result if node.color == 'white' else 1.0 - result
+            node = node.parent
+
+        if trace:
+            t5 = time.perf_counter()
+            for name, begin, end in (('clone', t0, t1), ('select', t1, t2), ('expand', t2, t3),
+                                     ('playout', t3, t4), ('backprop', t4, t5)):
+                trace.add_time(name, (end - begin) * 1e6)
+
+    def playout(self, board, color):
+        # board 에서 color 차례부터 가벼운 정책으로 끝까지 둬 보고 백색의 승점 반환 (board 는 변경됨)
+        game = self.game
+        for ply in range(self.max_playout):
+            moves = self.legal_moves(board, color)
+            if moves:
+                winner = game.apply_rules(board, *self._choose(board, moves))
+                if winner is not None:
+                    self.playout_plies += ply + 1
+                    return 1.0 if winner == 'white' else 0.0
+            else:
+                game.decay_cooldowns(board)
+            color = 'white' if color == 'black' else 'black'
+        self.playout_plies += self.max_playout
+        score = game.evaluate_board(board, None, 'white')
+        return 1 / (1 + math.exp(-self.eval_scale * score))
+
+    def _choose(self, board, moves):
+        # 플레이아웃 정책: greedy 확률로 한 번에 잡을 수 있는 기물 중 가장 비싼 것을 잡고, 아니면 무작위
+        if random.random() < self.greedy:
+            w = self.game.eval_weights
+            best = None
+            best_value = 0
+            for piece_pos, (r, c) in moves:
+                target = board[r][c]
+                if target is None: continue
+                attacker = board[piece_pos[0]][piece_pos[1]]
+                dmg = attacker.attack_damage - target.dmg_reduction
+                if dmg >= target.hp:
+                    value = target.max_hp * w['hp'] + target.base_ap * w['ap'] + w[target.name] + 1
+                    if value > best_value:
+                        best_value = value
+                        best = (piece_pos, (r, c))
+            if best: return best
+        return random.choice(moves)
+
+
+# --- 애니메이션 타임라인 ---
+# 이징 곡선은 미리 계산한 표에서 찾아 씀 (프레임마다 수식 계산 없음)
+EASING_STEPS = 256
+EASING = {
+    'linear': [i / (EASING_STEPS - 1) for i in range(EASING_STEPS)],
+    'ease_in': [(i / (EASING_STEPS - 1)) ** 2 for i in range(EASING_STEPS)],
+    'ease_out': [1 - (1 - i / (EASING_STEPS - 1)) ** 2 for i in range(EASING_STEPS)],
+    'ease_in_out': [(1 - math.cos(math.pi * i / (EASING_STEPS - 1))) / 2 for i in range(EASING_STEPS)],
+}
+
+class Tween:
+    """start 부터 duration(ms) 동안 draw(progress) 를 호출하고, 끝나면 on_complete 를 실행합니다."""
+    def __init__(self, start, duration, draw, easing='linear', on_complete=None, hides=(), blocking=False):
+        self.start = start
+        self.end = start + duration
+        self.duration = duration
+        self.draw = draw
+        self.curve = EASING[easing]
+        self.on_complete = on_complete
+        self.hides = hides  # 보드 위 정적 그리기에서 숨길 기물 (트윈이 대신 그림)
+        self.blocking = blocking  # 끝날 때까지 입력과 AI 차례를 막음 (게임 로직이 대기 중인 애니메이션)
+
+    def progress(self, now):
+        p = (now - self.start) / self.duration
+        if p <= 0: return self.curve[0]
+        if p >= 1: return self.curve[-1]
+        return self.curve[int(p * (EASING_STEPS - 1))]
+
+class Timeline:
+    """여러 트윈(이동, 공격 후 복귀, 관통, 데미지 숫자)을 동시에 관리하는 스케줄러입니다."""
+    def __init__(self):
+        self.tweens = []
+
+    def add(self, tween):
+        self.tweens.append(tween)
+        return tween
+
+    @property
+    def active(self):
+        return bool(self.tweens)
+
+    @property
+    def blocking(self):
+        return any(t.blocking for t in self.tweens)
+
+    def hidden_pieces(self, now):
+        return [p for t in self.tweens if t.start <= now for p in t.hides]
+
+    def update(self, now):
+        # 끝난 트윈을 끝난 순서대로 제거하고 완료 콜백 실행 (콜백이 새 트윈을 추가할 수 있음)
+        # 반환: 끝난 트윈이 있었는지 (있으면 마지막 프레임이 아닌 결과 국면을 다시 그려야 함)
+        finished = False
+        while True:
+            done = [t for t in self.tweens if t.end <= now]
+            if not done: return finished
+            finished = True
+            tween = min(done, key=lambda t: t.end)
+            self.tweens.remove(tween)
+            if tween.on_complete: tween.on_complete()
+
+    def clear(self):
+        # 완료 콜백 없이 모든 트윈 제거 (기록된 국면으로 이동할 때)
+        self.tweens = []
+
+    def finish_all(self):
+        # 화면 없이 실행할 때: 남은 트윈을 모두 즉시 완료
+        while self.tweens:
+            tween = min(self.tweens, key=lambda t: t.end)
+            self.tweens.remove(tween)
+            if tween.on_complete: tween.on_complete()
+
+    def draw(self, now):
+        for tween in self.tweens:
+            if tween.start <= now:
+                tween.draw(tween.progress(now))
+
+# --- 수 기록 (되돌리기/다시 하기/스크럽) ---
+class History:
+    """매 수가 끝난 뒤의 국면을 불변 스냅샷 (행 튜플들, 차례, 승자) 으로 저장합니다.
+    각 칸은 None 또는 기물 상태 튜플 (이름, 색, HP, 데미지 감소, 쿨타임, 첫 공격 여부) 이며,
+    직전 스냅샷과 같은 행/칸은 같은 튜플 객체를 공유하므로 수마다 바뀐 행만큼만 메모리가 늘어납니다."""
+    def __init__(self, game):
+        self.snapshots = []
+        self.cursor = -1  # 현재 보드가 몇 번째 스냅샷인지 (0 = 시작 국면)
+        self.record(game)
+
+    def record(self, game):
+        # 현재 국면을 커서 뒤에 추가 (되돌린 상태에서 새 수를 두면 그 뒤의 기록은 버림)
+        del self.snapshots[self.cursor + 1:]
+        prev_rows = self.snapshots[-1][0] if self.snapshots else None
+        rows = []
+        for r, row in enumerate(game.board):
+            prev_row = prev_rows[r] if prev_rows else None
+            cells = []
+            for c, p in enumerate(row):
+                state = None if p is None else (p.name, p.color, p.hp, p.dmg_reduction, p.special_cooldown, p.first_attack)
+                if prev_row and prev_row[c] == state: state = prev_row[c]
+                cells.append(state)
+            cells = tuple(cells)
+            rows.append(prev_row if prev_row == cells else cells)
+        self.snapshots.append((tuple(rows), game.turn, game.winner))
+        self.cursor = len(self.snapshots) - 1
+
+    @property
+    def at_end(self):
+        return self.cursor == len(self.snapshots) - 1
+
+    def seek(self, ply):
+        self.cursor = ply
+        return self.snapshots[ply]
+
+
 # --- 게임 엔진 & AI 로직 ---
 class Game:
-    def __init__(self, win):
+    def __init__(self, win, rows=ROWS, cols=COLS, board=None, turn='white', eval_weights=None):
+        # board/turn 을 주면 시작 국면 대신 그 국면으로 시작 (from_notation), eval_weights 를 주면 파일을 다시 읽지 않음
+        if rows < MIN_ROWS or cols < MIN_COLS:
+            raise ValueError(f"보드 크기는 최소 {MIN_ROWS}x{MIN_COLS} 이어야 합니다: {rows}x{cols}")
         self.win = win
-        self.board = [[None for _ in range(COLS)] for _ in range(ROWS)]
-        self.turn = 'white'  
+        self.rows, self.cols = rows, cols
+        self.geometry = BoardGeometry.get(rows, cols)
+        self.square_size = BOARD_SIZE // max(rows, cols)
+        self.board = board if board is not None else [[None for _ in range(cols)] for _ in range(rows)]
+        self.turn = turn
         self.selected_piece = None
         self.valid_moves = []
         self.winner = None
-        self._init_board()
-        
-        # --- 애니메이션 상태 변수 ---
-        self.is_animating = False
-        self.animation_piece = None
-        self.animation_start_pos = None
-        self.animation_target_pos = None
-        self.animation_start_time = 0
-        self.animation_duration = 300 # ms
-        self.pending_move_data = {}
+        self.eval_weights = eval_weights if eval_weights is not None else load_eval_weights()
+        if board is None: self._init_board()
+
+        # 수 기록 (되돌리기/다시 하기/스크럽 바)
+        self.history = History(self)
+
+        # AI 탐색 기록 (SearchTrace 를 넣으면 켜짐, None 이면 기록하지 않음)
+        self.trace = None
+
+        # AI 엔진 선택: 'minimax' (1수 평가) 또는 'mcts' (몬테카를로 트리 탐색, self.mcts 에 트리 유지)
+        self.ai_engine = 'minimax'
+        self.mcts = None
         
-        # 데미지 표시 상태 변수 (r, c, damage, start_time)
-        self.damage_displays = []
+        # --- 애니메이션 타임라인 (공격/이동/관통/데미지 표시 트윈) ---
+        self.timeline = Timeline()
+        self.animation_duration = 300 # ms
+        self.slide_duration = 150 # ms, 단순 이동
+        self.damage_display_duration = 1000 # ms
+
+        # 진영별 공격 범위 맵 (이동할 때마다 증분 갱신)
+        self.attack_maps = {'white': AttackMap('white', rows, cols), 'black': AttackMap('black', rows, cols)}
+        for attack_map in self.attack_maps.values():
+            attack_map.rebuild(self, self.board)
+
+    @property
+    def is_animating(self):
+        # 게임 로직이 애니메이션 완료를 기다리는 중인지 (데미지 숫자 등 장식용 트윈은 제외)
+        return self.timeline.blocking
 
     def _init_board(self):
-        names = ['Rook', 'Knight', 'Bishop', 'Queen', 'King', 'Bishop', 'Knight', 'Rook']
-        for i in range(8):
+        names = self.geometry.back_rank()
+        last = self.rows - 1
+        for i in range(self.cols):
             self.board[1][i] = Piece('Pawn', 'black', 1, i)
-            self.board[6][i] = Piece('Pawn', 'white', 6, i)
+            self.board[last - 1][i] = Piece('Pawn', 'white', last - 1, i)
             self.board[0][i] = Piece(names[i], 'black', 0, i)
-            self.board[7][i] = Piece(names[i], 'white', 7, i)
+            self.board[last][i] = Piece(names[i], 'white', last, i)
 
-    # --- 표준 체스 이동 규칙 및 슬라이딩 기물 로직 ---
+    # --- 표준 체스 이동 규칙 및 슬라이딩 기물 로직 (보드 크기별 이동 표 사용) ---
     def get_valid_moves(self, piece, board_state=None):
         if board_state is None: board_state = self.board
+        geo = self.geometry
         moves = []
         r, c = piece.row, piece.col
-        
-        def _get_linear_moves(r, c, directions, color):
-            linear_moves = []
-            for dr, dc in directions:
-                for i in range(1, 8):
-                    nr, nc = r + dr*i, c + dc*i
-                    if 0 <= nr < 8 and 0 <= nc < 8:
-                        t = board_state[nr][nc]
-                        if t is None:
-                            linear_moves.append((nr, nc))
-                        elif t.color != color:
-                            linear_moves.append((nr, nc))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-            return linear_moves
 
         if piece.name == 'Pawn':
             direction = -1 if piece.color == 'white' else 1
             nr, nc = r + direction, c
-            if 0 <= nr < 8 and board_state[nr][nc] is None:
+            if 0 <= nr < geo.rows and board_state[nr][nc] is None:
                 moves.append((nr, nc))
-                if (piece.color == 'white' and r == 6) or (piece.color == 'black' and r == 1):
+                if r == geo.pawn_start[piece.color]:
                     nr2, nc2 = r + direction * 2, c
-                    if board_state[nr2][nc2] is None: moves.append((nr2, nc2))
-            for dc in [-1, 1]:
-                nr_cap, nc_cap = r + direction, c + dc
-                if 0 <= nr_cap < 8 and 0 <= nc_cap < 8:
-                    target = board_state[nr_cap][nc_cap]
-                    if target and target.color != piece.color: moves.append((nr_cap, nc_cap))
+                    if geo.inside(nr2, nc2) and board_state[nr2][nc2] is None: moves.append((nr2, nc2))
+            for nr_cap, nc_cap in geo.pawn_attacks[piece.color][r][c]:
+                target = board_state[nr_cap][nc_cap]
+                if target and target.color != piece.color: moves.append((nr_cap, nc_cap))
             return moves
-        elif piece.name == 'Rook':  
-            moves.extend(_get_linear_moves(r, c, [(0,1), (0,-1), (1,0), (-1,0)], piece.color))
-        elif piece.name == 'Bishop':  
-            moves.extend(_get_linear_moves(r, c, [(1,1), (1,-1), (-1,1), (-1,-1)], piece.color))
-        elif piece.name == 'Queen':  
-            directions = [(0,1), (0,-1), (1,0), (-1,0), (1,1), (1,-1), (-1,1), (-1,-1)]
-            moves.extend(_get_linear_moves(r, c, directions, piece.color))
-        elif piece.name == 'Knight':
-            offsets = [(r-2, c-1), (r-2, c+1), (r-1, c-2), (r-1, c+2),  
-                        (r+1, c-2), (r+1, c+2), (r+2, c-1), (r+2, c+1)]
-            for nr, nc in offsets:
-                if 0 <= nr < 8 and 0 <= nc < 8:
+        elif piece.name in AttackMap.SLIDERS:
+            for ray in geo.rays[piece.name][r][c]:
+                for nr, nc in ray:
                     t = board_state[nr][nc]
-                    if t is None or t.color != piece.color: moves.append((nr,nc))
-        elif piece.name == 'King':  
-            for dr in [-1,0,1]:
-                for dc in [-1,0,1]:
-                    if dr==0 and dc==0: continue
-                    nr, nc = r+dr, c+dc
-                    if 0 <= nr < 8 and 0 <= nc < 8:
-                        t = board_state[nr][nc]
-                        if t is None or t.color != piece.color: moves.append((nr,nc))
-                            
+                    if t is None:
+                        moves.append((nr, nc))
+                    else:
+                        if t.color != piece.color: moves.append((nr, nc))
+                        break
+        else:  # Knight, King
+            for nr, nc in geo.steps[piece.name][r][c]:
+                t = board_state[nr][nc]
+                if t is None or t.color != piece.color: moves.append((nr,nc))
+
         return moves
-        
+
+    # --- 공격 범위 계산 (공격 범위 맵용) ---
+    def get_attack_squares(self, piece, board_state, r, c):
+        # 기물이 공격할 수 있는 칸 목록. 슬라이딩 기물은 처음 막힌 칸(아군 포함)까지 포함하고,
+        # 폰은 대각선 두 칸을 기물 유무와 관계없이 포함합니다.
+        geo = self.geometry
+        if piece.name == 'Pawn':
+            return list(geo.pawn_attacks[piece.color][r][c])
+        if piece.name in AttackMap.SLIDERS:
+            squares = []
+            for ray in geo.rays[piece.name][r][c]:
+                for nr, nc in ray:
+                    squares.append((nr, nc))
+                    if board_state[nr][nc] is not None: break
+            return squares
+        return list(geo.steps[piece.name][r][c])
+
+    def get_piece_moves(self, piece):
+        # 실제 보드에서의 이동 가능 칸. 폰 이외의 기물은 공격 범위 맵에서 바로 꺼내 씁니다.
+        if piece.name == 'Pawn':
+            return self.get_valid_moves(piece)
+        return self.attack_maps[piece.color].moves_from(self.board, piece.row, piece.col)
+
+    def touched_squares(self, piece, move, board_state):
+        # 이동으로 점유 상태가 바뀔 수 있는 칸: 출발 칸, 도착 칸, 퀸 관통 공격의 뒤쪽 칸
+        target_r, target_c = move
+        squares = [(piece.row, piece.col), (target_r, target_c)]
+        target = board_state[target_r][target_c]
+        if piece.name == 'Queen' and piece.special_cooldown == 0 and target and target.color != piece.color:
+            dr = (target_r > piece.row) - (target_r < piece.row)
+            dc = (target_c > piece.col) - (target_c < piece.col)
+            behind_r, behind_c = target_r + dr, target_c + dc
+            if self.geometry.inside(behind_r, behind_c):
+                squares.append((behind_r, behind_c))
+        return squares
+
+    def update_attack_maps(self, squares, board=None, attack_maps=None):
+        if board is None: board = self.board
+        if attack_maps is None: attack_maps = self.attack_maps
+        for attack_map in attack_maps.values():
+            attack_map.update(self, board, squares)
+        return attack_maps
+
+    def get_lethal_squares(self, piece):
+        # 선택한 기물이 그 수를 두면 상대의 다음 공격 한 번에 죽게 되는 이동 칸 (UI 하이라이트용, 공격 수 포함)
+        # find_best_move 처럼 수를 적용한 보드에서 상대 맵 복사본을 증분 갱신해 판정하므로,
+        # 기물이 떠나면서 열리는 상대의 공격 경로와 이동 후 스탯(룩 데미지 감소, 킹 회복)이 반영됨
+        enemy = 'white' if piece.color == 'black' else 'black'
+        lethal = []
+        for move in self.valid_moves:
+            board = clone_board(self.board)
+            touched = self.touched_squares(piece, move, self.board)
+            if self.apply_rules(board, (piece.row, piece.col), move):
+                continue  # 킹을 잡아 승리하는 수
+            enemy_maps = self.update_attack_maps(touched, board, {enemy: self.attack_maps[enemy].copy()})
+            # 공격한 상대가 살아남으면 기물은 제자리에 남음
+            moved = board[piece.row][piece.col] or board[move[0]][move[1]]
+            if enemy_maps[enemy].max_hit(moved.row, moved.col, moved.dmg_reduction) >= moved.hp:
+                lethal.append(move)
+        return lethal
+
+    def get_threatened_pieces(self, color, board=None, attack_maps=None):
+        # 상대의 다음 공격으로 HP가 0 이하가 될 수 있는 color 진영의 기물 목록
+        if board is None: board = self.board
+        if attack_maps is None: attack_maps = self.attack_maps
+        enemy_map = attack_maps['white' if color == 'black' else 'black']
+        threatened = []
+        for r in range(self.rows):
+            for c in range(self.cols):
+                p = board[r][c]
+                if p and p.color == color and enemy_map.hits[r][c]:
+                    if enemy_map.max_hit(r, c, p.dmg_reduction) >= p.hp:
+                        threatened.append(p)
+        return threatened
+
     # --- AI의 뇌: 보드 평가  ---
-    def evaluate_board(self, board):
+    def evaluate_board(self, board, attack_maps=None, color='black'):
+        # color 진영의 관점에서 평가 (방금 수를 둔 진영)
+        w = self.eval_weights
+        enemy = 'white' if color == 'black' else 'black'
         score = 0
-        for r in range(ROWS):
-            for c in range(COLS):
+        for r in range(self.rows):
+            for c in range(self.cols):
                 p = board[r][c]
                 if p:
-                    value = p.hp + (p.ap * 2)
-                    if p.name == 'Queen': value += 15
-                    if p.name == 'King': value += 100
-                    if p.color == 'black': score += value
+                    value = p.hp * w['hp'] + p.ap * w['ap'] + w[p.name]
+                    # 공격 범위 맵이 있으면 상대의 다음 공격에 죽을 수 있는 기물의 가치를 낮춰 평가
+                    if attack_maps and p.color == color:
+                        enemy_map = attack_maps[enemy]
+                        if enemy_map.max_hit(r, c, p.dmg_reduction) >= p.hp:
+                            value *= 1 - w['threat']
+                    if p.color == color: score += value
                     else: score -= value
+        # 기동성 (공격 가능한 칸 수의 차이)
+        if attack_maps:
+            score += w['mobility'] * (attack_maps[color].mobility - attack_maps[enemy].mobility)
         return score
 
+    def eval_features(self, board, attack_maps, color='black'):
+        # evaluate_board 를 가중치에 대한 식으로 풀어 쓴 특징 벡터 (tune_weights.py 에서 사용)
+        # 반환: (위협받지 않는 기물 특징, 위협받는 color 기물 특징, 기동성 차이)
+        #   evaluate_board = sum(w[k] * (plain[k] + (1 - w['threat']) * threatened[k])) + w['mobility'] * mobility
+        keys = EVAL_FEATURE_KEYS
+        plain = dict.fromkeys(keys, 0)
+        threatened = dict.fromkeys(keys, 0)
+        enemy = 'white' if color == 'black' else 'black'
+        enemy_map = attack_maps[enemy]
+        for r in range(self.rows):
+            for c in range(self.cols):
+                p = board[r][c]
+                if p:
+                    sign = 1 if p.color == color else -1
+                    bucket = plain
+                    if p.color == color and enemy_map.max_hit(r, c, p.dmg_reduction) >= p.hp:
+                        bucket = threatened
+                    bucket['hp'] += sign * p.hp
+                    bucket['ap'] += sign * p.ap
+                    bucket[p.name] += sign
+        mobility = attack_maps[color].mobility - attack_maps[enemy].mobility
+        return [plain[k] for k in keys], [threatened[k] for k in keys], mobility
+
+    def ai_move(self):
+        if self.ai_engine == 'mcts': self.ai_move_mcts()
+        else: self.ai_move_minimax()
+
     # --- AI 이동 (Minimax - 1-depth) ---
     def ai_move_minimax(self):
         if self.winner: return
 
         print("AI Thinking...")
-        best_score = -float('inf')
-        best_move = None
-        best_piece_pos = None
+        best_piece_pos, best_move, _ = self.find_best_move('black')
 
-        pieces = [self.board[r][c] for r in range(ROWS) for c in range(COLS)  
-                  if self.board[r][c] and self.board[r][c].color == 'black']
+        if best_piece_pos and best_move:
+            real_piece = self.board[best_piece_pos[0]][best_piece_pos[1]]
+            self.selected_piece = real_piece
+            self.execute_real_move(best_move[0], best_move[1])
+        else:
+            print("AI has no valid moves.")
+            self.change_turn()
+            self.history.record(self)
 
-        for piece in pieces:
-            valid_moves = self.get_valid_moves(piece, self.board)
-            for move in valid_moves:
-                temp_board_obj = copy.deepcopy(self.board)  
-                temp_piece = temp_board_obj[piece.row][piece.col]
-            
-                simulated_board = self.simulate_move(temp_piece, move, temp_board_obj)
-                
-                score = self.evaluate_board(simulated_board)
-                score += random.uniform(0, 0.5)
+    # --- AI 이동 (MCTS) ---
+    def ai_move_mcts(self):
+        if self.winner: return
 
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-                    best_piece_pos = (piece.row, piece.col)
+        if self.mcts is None: self.mcts = MCTS(self)
+        print("AI Thinking (MCTS)...")
+        best_piece_pos, best_move, win_rate = self.mcts.search('black')
+        stats = self.mcts.last_stats
+        print(f"MCTS: {stats['iterations']} playouts ({stats['reused']} reused) in {stats['time_ms']:.0f}ms, win rate {win_rate:.2f}")
 
         if best_piece_pos and best_move:
             real_piece = self.board[best_piece_pos[0]][best_piece_pos[1]]
@@ -262,199 +955,152 @@ class Game:
         else:
             print("AI has no valid moves.")
             self.change_turn()
+            self.history.record(self)
 
-    def simulate_move(self, piece, move, board_copy):
-        target_r, target_c = move
-        target = board_copy[target_r][target_c]
-        attacker = board_copy[piece.row][piece.col]
-        
-        # --- 퀸 관통 공격 시뮬레이션 로직 ---
-        if target and target.color != attacker.color:
-            dmg = attacker.ap + (3 if attacker.name == 'Knight' else 0)
-            real_dmg = max(0, dmg - target.dmg_reduction)
-            
-            # 퀸 관통 공격 (3턴의 쿨타임 고려)
-            if attacker.name == 'Queen' and attacker.special_cooldown == 0:
-                # 1. 방향 벡터 계산
-                dr = 0
-                dc = 0
-                if target_r != piece.row:
-                    dr = (target_r - piece.row) // abs(target_r - piece.row)
-                if target_c != piece.col:
-                    dc = (target_c - piece.col) // abs(target_c - piece.col)
-                
-                behind_r, behind_c = target_r + dr, target_c + dc
-                
-                if 0 <= behind_r < 8 and 0 <= behind_c < 8:
-                    behind_target = board_copy[behind_r][behind_c]
-                    if behind_target and behind_target.color != attacker.color:
-                        second_dmg = attacker.ap + (3 if attacker.name == 'Knight' else 0)
-                        second_real_dmg = max(0, second_dmg - behind_target.dmg_reduction)
-                        behind_target.hp -= second_real_dmg
+    def find_best_move(self, color, noise=0.5):
+        # color 진영의 모든 이동을 시뮬레이션해 평가 점수가 가장 높은 (기물 위치, 이동, 점수) 반환
+        # noise: 같은 점수의 수 중 하나를 무작위로 고르기 위해 더하는 값의 최대치 (분석용은 0)
+        # self.trace 가 있으면 구간별 시간과 후보 수별 점수를 기록 (1수 탐색이라 가지치기/치환표는 항상 0)
+        trace = self.trace
+        span = trace.span if trace else null_span
+        best_score = -float('inf')
+        best_move = None
+        best_piece_pos = None
+        root_moves = []
+
+        with span('find_best_move', color=color) as info:
+            depth_start = time.perf_counter()
+            with span('depth 1'):
+                with span('movegen'):
+                    pieces = [self.board[r][c] for r in range(self.rows) for c in range(self.cols)  
+                              if self.board[r][c] and self.board[r][c].color == color]
+                    candidates = [(piece, move) for piece in pieces for move in self.get_valid_moves(piece, self.board)]
+
+                for piece, move in candidates:
+                    with span('move') as move_info:
+                        with span('copy'):
+                            simulated_board = clone_board(self.board)
+                        touched = self.touched_squares(piece, move, self.board)
+                    
+                        # 실제 수와 같은 규칙(apply_rules)으로 복사본에 수를 적용
+                        with span('simulate'):
+                            self.apply_rules(simulated_board, (piece.row, piece.col), move)
                         
-                        if behind_target.hp <= 0:
-                            board_copy[behind_r][behind_c] = None
+                        # 현재 공격 범위 맵을 복사해 바뀐 칸만 증분 갱신
+                        with span('attack_maps'):
+                            temp_maps = {side: attack_map.copy() for side, attack_map in self.attack_maps.items()}
+                            self.update_attack_maps(touched, simulated_board, temp_maps)
+                        
+                        with span('evaluate'):
+                            score = self.evaluate_board(simulated_board, temp_maps, color)
+                        if noise: score += random.uniform(0, noise)
 
-            target.hp -= real_dmg
-            
-            if target.hp <= 0:
-                board_copy[target_r][target_c] = None
-                board_copy[attacker.row][attacker.col] = None
-                attacker.move(target_r, target_c)
-                board_copy[target_r][target_c] = attacker
-            
-            # 공격 대상이 생존했을 경우, 공격자는 원래 위치로 돌아가므로 이동 로직 없음
-        else:
-            # 단순 이동
-            board_copy[attacker.row][attacker.col] = None
-            attacker.move(target_r, target_c)
-            board_copy[target_r][target_c] = attacker
-            
-        # 힐/버프 적용 
-        if attacker.name == 'Bishop':
-             for r in range(target_r-1, target_r+2):
-                 for c in range(target_c-1, target_c+2):
-                     if 0<=r<8 and 0<=c<8:
-                         p = board_copy[r][c]
-                         if p and p.color == attacker.color: p.hp = min(p.max_hp, p.hp + 3)
-        if attacker.name == 'King':
-             attacker.hp = min(attacker.max_hp, attacker.hp + 4)
-        
-        return board_copy
+                        if trace:
+                            move_info.update(move=self.move_name((piece.row, piece.col), move), score=round(score, 3))
+                            root_moves.append(dict(move_info))
+
+                        if score > best_score:
+                            best_score = score
+                            best_move = move
+                            best_piece_pos = (piece.row, piece.col)
+
+            if trace:
+                best = self.move_name(best_piece_pos, best_move) if best_move else None
+                summary = {'engine': 'minimax', 'color': color, 'ply': self.history.cursor,
+                           'best': best, 'score': round(best_score, 3) if best_move else None,
+                           'pv': [best] if best else [],
+                           'depths': [{'depth': 1, 'time_ms': round((time.perf_counter() - depth_start) * 1000, 3),
+                                       'nodes': len(candidates)}],
+                           'root_moves': sorted(root_moves, key=lambda m: -m['score']),
+                           'cutoffs': 0, 'tt_probes': 0, 'tt_hits': 0}
+                info.update(summary)
+                trace.decisions += 1
+
+        return best_piece_pos, best_move, best_score
 
     # --- 애니메이션 시작 및 완료 로직 ---
     def start_attack_animation(self, piece, target_r, target_c):
         target = self.board[target_r][target_c]
         
-        # 1. Damage Calculation (Main Target)
-        dmg = 0
-        real_dmg = 0
-        if target and target.color != piece.color:
-            dmg = piece.ap + (3 if piece.name == 'Knight' else 0)
-            real_dmg = max(0, dmg - target.dmg_reduction)
-            
-        # 2. Queen's Special Attack Calculation (Secondary Target)
+        # 1. Damage Calculation: 복사한 보드에 apply_rules 를 미리 적용해 체력 차이로 계산
+        #    (실제 보드는 애니메이션이 끝난 뒤 complete_move_after_animation 에서 같은 규칙으로 변경)
+        touched = self.touched_squares(piece, (target_r, target_c), self.board)
+        preview = clone_board(self.board)
+        preview_target = preview[target_r][target_c]
+        
+        # 2. Queen's Special Attack (Secondary Target): touched_squares 의 세 번째 칸이 관통 대상 칸
         behind_target = None
-        second_real_dmg = 0
+        preview_behind = None
+        if len(touched) > 2:
+            behind_r, behind_c = touched[2]
+            behind_target = self.board[behind_r][behind_c]
+            preview_behind = preview[behind_r][behind_c]
+            if behind_target and behind_target.color == piece.color:
+                behind_target = preview_behind = None
         
-        if piece.name == 'Queen' and piece.special_cooldown == 0 and target and target.color != piece.color:
-            # 1. 방향 벡터 계산
-            dr = 0
-            dc = 0
-            if target_r != piece.row:
-                dr = (target_r - piece.row) // abs(target_r - piece.row)
-            if target_c != piece.col:
-                dc = (target_c - piece.col) // abs(target_c - piece.col)
-            
-            behind_r, behind_c = target_r + dr, target_c + dc
-            
-            if 0 <= behind_r < 8 and 0 <= behind_c < 8:
-                behind_target = self.board[behind_r][behind_c]
+        self.apply_rules(preview, (piece.row, piece.col), (target_r, target_c), end_turn=False)
+        real_dmg = target.hp - preview_target.hp
+        second_real_dmg = behind_target.hp - preview_behind.hp if behind_target else 0
                 
-            if behind_target and behind_target.color != piece.color:
-                second_dmg = piece.ap + (3 if piece.name == 'Knight' else 0)
-                second_real_dmg = max(0, second_dmg - behind_target.dmg_reduction)
-                
-        # 3. Set Animation State
-        self.is_animating = True
-        self.animation_piece = piece
-        self.animation_start_pos = (piece.row, piece.col)
-        self.animation_target_pos = (target_r, target_c)
-        self.animation_start_time = pygame.time.get_ticks()
-        
-        # 4. Store calculated data for post-animation execution
-        self.pending_move_data = {
+        # 3. Store calculated data for post-animation execution
+        data = {
+            'piece': piece,
+            'start_pos': (piece.row, piece.col),
             'target_r': target_r,
             'target_c': target_c,
             'real_dmg': real_dmg,
             'target_piece': target,
+            'target_survives': preview_target.hp > 0,
             'behind_target': behind_target, # 퀸 능력으로 인한 두 번째 타겟
             'second_real_dmg': second_real_dmg
         }
         
-    def complete_move_after_animation(self):
+        # 4. Schedule Animation (끝나면 게임 로직 실행)
+        self.timeline.add(Tween(pygame.time.get_ticks(), self.animation_duration,
+                                lambda progress: self.draw_attack_animation(data, progress),
+                                on_complete=lambda: self.complete_move_after_animation(data),
+                                hides=(piece,), blocking=True))
+        
+    def complete_move_after_animation(self, data):
         now = pygame.time.get_ticks()
-        piece = self.animation_piece
-        data = self.pending_move_data
+        piece = data['piece']
         r, c = data['target_r'], data['target_c']
         target = data['target_piece']
         real_dmg = data['real_dmg']
-        start_r, start_c = self.animation_start_pos
+        touched = self.touched_squares(piece, (r, c), self.board)
         
-        # Reset animation state
-        self.is_animating = False
-        self.animation_piece = None
+        # 1. 규칙 적용 (전투, 퀸 관통, 잡기/이동, 능력 발동). 차례 넘김은 아래 change_turn 에서
+        winner = self.apply_rules(self.board, data['start_pos'], (r, c), end_turn=False)
         
-        # 1. Combat/Attack Logic
-        if target and target.color != piece.color:
-            target.hp -= real_dmg
-            print(f"Battle: {piece.name} -> {target.name} (DMG: {real_dmg}, Remaining HP: {target.hp})")
-            
-            # 데미지 숫자 표시 시작 (Main Target)
-            if real_dmg > 0:
-                self.damage_displays.append((r, c, -real_dmg, now))
-                
-            piece.first_attack = False
-            
-            # --- 퀸 관통 공격 처리 ---
-            behind_target = data.get('behind_target')
-            second_real_dmg = data.get('second_real_dmg', 0)
-            
-            if piece.name == 'Queen' and piece.special_cooldown == 0:
-                piece.special_cooldown = piece.special_cooldown_max # 쿨타임 적용
-                
-                if behind_target and behind_target.color != piece.color:
-                    behind_target.hp -= second_real_dmg
-                    print(f"Queen Special: Pierce -> {behind_target.name} (DMG: {second_real_dmg}, Remaining HP: {behind_target.hp})")
-                    
-                    # 데미지 숫자 표시 시작 (Secondary Target)
-                    if second_real_dmg > 0:
-                        # 약간 늦게 표시
-                        self.damage_displays.append((behind_target.row, behind_target.col, -second_real_dmg, now + 100)) 
-                        
-                    if behind_target.hp <= 0:
-                        if behind_target.name == 'King':
-                            self.winner = piece.color
-                            print(f"\n*** GAME OVER! {self.winner.upper()} WINS! ***\n")
-                        self.board[behind_target.row][behind_target.col] = None
-            # --- 퀸 관통 공격 처리 끝 ---
-
-            # 메인 타겟 처리
-            if target.hp <= 0:
-                if target.name == 'King':
-                    self.winner = piece.color
-                    print(f"\n*** GAME OVER! {self.winner.upper()} WINS! ***\n")
-                
-                # Attacker moves to target's square (Capture)
-                self.board[start_r][start_c] = None
-                piece.move(r, c)
-                self.board[r][c] = piece
-            else:
-                # Target survives, attacker moves back to start (Attack and Return)
-                pass
+        # 2. 전투 결과 출력과 효과 (Main Target)
+        print(f"Battle: {piece.name} -> {target.name} (DMG: {real_dmg}, Remaining HP: {target.hp})")
+        if real_dmg > 0:
+            self.add_damage_display(r, c, real_dmg, now)
             
-        # 2. Non-Combat Move / Move after Capture
-        # 타겟이 없었거나, 아군이었거나, 타겟을 잡았을 경우 이동
-        if not target or target.color == piece.color or target.hp <= 0:
-            self.board[start_r][start_c] = None
-            piece.move(r, c)
-            self.board[r][c] = piece
-
-        # 3. Special Ability Trigger (이동 후) - 기존 능력 유지
-        if piece.name == 'Bishop':
-              for nr in range(r-1, r+2):
-                  for nc in range(c-1, c+2):
-                      if 0<=nr<8 and 0<=nc<8:
-                          p = self.board[nr][nc]
-                          if p and p.color == piece.color: p.hp = min(p.max_hp, p.hp+3)
-        if piece.name == 'Rook': piece.dmg_reduction = 3
-        if piece.name == 'King': piece.hp = min(piece.max_hp, piece.hp + 4)
+        # --- 퀸 관통 공격 효과 (Secondary Target) ---
+        behind_target = data['behind_target']
+        second_real_dmg = data['second_real_dmg']
+        if behind_target:
+            print(f"Queen Special: Pierce -> {behind_target.name} (DMG: {second_real_dmg}, Remaining HP: {behind_target.hp})")
+            self.timeline.add(Tween(now, 200, lambda progress, src=(r, c), dst=(behind_target.row, behind_target.col):
+                                    self.draw_pierce(src, dst, progress), easing='ease_out'))
+            if second_real_dmg > 0:
+                # 약간 늦게 표시
+                self.add_damage_display(behind_target.row, behind_target.col, second_real_dmg, now + 100)
+        
+        if winner:
+            self.winner = winner
+            print(f"\n*** GAME OVER! {self.winner.upper()} WINS! ***\n")
+        
+        # 공격 범위 맵 증분 갱신 (공격 후 제자리로 돌아온 폰의 AP 변화도 반영)
+        self.update_attack_maps(touched)
         
         self.selected_piece = None
         self.valid_moves = []
         
         if self.winner is None:  
             self.change_turn()
+        self.history.record(self)
 
     # --- 실제 이동 실행 (플레이어/AI 공용) ---
     def execute_real_move(self, r, c):
@@ -465,81 +1111,272 @@ class Game:
              # 공격이면 애니메이션 시작
              self.start_attack_animation(piece, r, c)
         else:
-             # 단순 이동 (애니메이션 없음)
-             self.board[piece.row][piece.col] = None
-             piece.move(r, c)
-             self.board[r][c] = piece
-             
-             # 능력 발동
-             if piece.name == 'Bishop':
-                 for nr in range(r-1, r+2):
-                      for nc in range(c-1, c+2):
-                          if 0<=nr<8 and 0<=nc<8:
-                              p = self.board[nr][nc]
-                              if p and p.color == piece.color: p.hp = min(p.max_hp, p.hp+3)
-             if piece.name == 'Rook': piece.dmg_reduction = 3
-             if piece.name == 'King': piece.hp = min(piece.max_hp, piece.hp + 4)
+             # 단순 이동 (로직은 바로 적용하고 미끄러지는 애니메이션만 재생)
+             start = (piece.row, piece.col)
+             touched = [start, (r, c)]
+             # 이동과 능력 발동은 apply_rules 로 (차례 넘김은 아래 change_turn 에서)
+             self.apply_rules(self.board, start, (r, c), end_turn=False)
+             self.update_attack_maps(touched)
+             self.timeline.add(Tween(pygame.time.get_ticks(), self.slide_duration,
+                                     lambda progress: self.draw_slide(piece, start, (r, c), progress),
+                                     easing='ease_out', hides=(piece,)))
              
              self.selected_piece = None
              self.valid_moves = []
              
              if self.winner is None: self.change_turn()
+             self.history.record(self)
+
+    # --- 화면 없이 수를 바로 적용 (튜닝/분석 도구용) ---
+    def apply_move(self, piece_pos, move):
+        self.selected_piece = self.board[piece_pos[0]][piece_pos[1]]
+        self.execute_real_move(move[0], move[1])
+        self.timeline.finish_all()
+
+    def apply_rules(self, board, piece_pos, move, end_turn=True):
+        # 게임 규칙(전투, 퀸 관통, 잡기/이동, 능력 발동)을 애니메이션/출력/공격 범위 맵 갱신 없이 board 에 바로 적용
+        # 실제 수(complete_move_after_animation / execute_real_move), find_best_move, MCTS 플레이아웃이 모두 사용
+        # 반환: 킹을 잡아 승리한 진영 (없으면 None)
+        # end_turn: 승자가 없으면 차례가 넘어간 것으로 보고 쿨타임도 감소 (실제 수는 change_turn 이 대신 처리)
+        piece = board[piece_pos[0]][piece_pos[1]]
+        r, c = move
+        target = board[r][c]
+        winner = None
+        if target and target.color != piece.color:
+            dmg = piece.attack_damage
+            target.hp -= max(0, dmg - target.dmg_reduction)
+            piece.first_attack = False
+
+            # 퀸 관통 공격
+            if piece.name == 'Queen' and piece.special_cooldown == 0:
+                piece.special_cooldown = piece.special_cooldown_max
+                behind_r = r + (r > piece.row) - (r < piece.row)
+                behind_c = c + (c > piece.col) - (c < piece.col)
+                if self.geometry.inside(behind_r, behind_c):
+                    behind_target = board[behind_r][behind_c]
+                    if behind_target and behind_target.color != piece.color:
+                        behind_target.hp -= max(0, dmg - behind_target.dmg_reduction)
+                        if behind_target.hp <= 0:
+                            if behind_target.name == 'King': winner = piece.color
+                            board[behind_r][behind_c] = None
+
+            if target.hp <= 0:
+                if target.name == 'King': winner = piece.color
+                board[piece.row][piece.col] = None
+                piece.move(r, c)
+                board[r][c] = piece
+        else:
+            board[piece.row][piece.col] = None
+            piece.move(r, c)
+            board[r][c] = piece
+
+        # 능력 발동
+        if piece.name == 'Bishop':
+            for nr, nc in self.geometry.neighbors[r][c]:
+                p = board[nr][nc]
+                if p and p.color == piece.color: p.hp = min(p.max_hp, p.hp + 3)
+        if piece.name == 'Rook': piece.dmg_reduction = 3
+        if piece.name == 'King': piece.hp = min(piece.max_hp, piece.hp + 4)
+
+        if winner is None and end_turn: self.decay_cooldowns(board)
+        return winner
+
+    # --- 국면 표기법 (FEN 방식 + RPG 스탯) ---
+    # 예: "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w"
+    #   대문자 = 백색, 소문자 = 흑색, 숫자 = 연속된 빈 칸 수, 마지막 필드 = 차례 (w/b)
+    #   기본 스탯과 다른 기물은 뒤에 [HP,플래그...] 를 붙임
+    #     r<n>: 데미지 감소, c<n>: 퀸 관통 쿨타임, a: 첫 공격 사용함 (폰 보너스 없음)
+    #   예: "Q[11,c2]" = HP 11, 쿨타임 2 인 백색 퀸, "p[4,a]" = HP 4, 첫 공격을 사용한 흑색 폰
+    def to_notation(self, board=None, turn=None):
+        if board is None: board = self.board
+        if turn is None: turn = self.turn
+        ranks = []
+        for row in board:
+            text = ''
+            empty = 0
+            for p in row:
+                if p is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += Piece.SYMBOLS[p.name] if p.color == 'white' else Piece.SYMBOLS[p.name].lower()
+                stats = []
+                if p.dmg_reduction: stats.append(f'r{p.dmg_reduction}')
+                if p.special_cooldown: stats.append(f'c{p.special_cooldown}')
+                if not p.first_attack: stats.append('a')
+                if stats or p.hp != p.max_hp:
+                    text += '[' + ','.join([str(p.hp)] + stats) + ']'
+            if empty:
+                text += str(empty)
+            ranks.append(text)
+        return '/'.join(ranks) + (' w' if turn == 'white' else ' b')
+
+    @classmethod
+    def from_notation(cls, text, win=None, eval_weights=None):
+        fields = text.split()
+        if len(fields) != 2 or fields[1] not in ('w', 'b'):
+            raise ValueError(f"잘못된 국면 표기: {text!r} (\"<보드> <w|b>\" 형식이어야 합니다)")
+        names = {symbol: name for name, symbol in Piece.SYMBOLS.items()}
+        placements = []
+        cols = None
+        ranks = fields[0].split('/')
+        for r, rank in enumerate(ranks):
+            c = 0
+            i = 0
+            while i < len(rank):
+                ch = rank[i]
+                if ch.isdigit():
+                    j = i
+                    while j < len(rank) and rank[j].isdigit(): j += 1
+                    c += int(rank[i:j])
+                    i = j
+                    continue
+                if ch.upper() not in names:
+                    raise ValueError(f"잘못된 기물 기호 {ch!r}: {rank}")
+                stats = None
+                i += 1
+                if i < len(rank) and rank[i] == '[':
+                    end = rank.find(']', i)
+                    if end < 0:
+                        raise ValueError(f"닫히지 않은 스탯 표기: {rank}")
+                    stats = rank[i + 1:end].split(',')
+                    i = end + 1
+                placements.append((names[ch.upper()], 'white' if ch.isupper() else 'black', r, c, stats))
+                c += 1
+            if cols is None: cols = c
+            elif c != cols:
+                raise ValueError(f"{r + 1}번째 줄의 칸 수({c})가 첫 줄({cols})과 다릅니다.")
+
+        if not cols:
+            raise ValueError(f"빈 보드입니다: {text!r}")
+        rows = len(ranks)
+        if rows < MIN_ROWS or cols < MIN_COLS:
+            raise ValueError(f"보드 크기는 최소 {MIN_ROWS}x{MIN_COLS} 이어야 합니다: {rows}x{cols} ({text!r})")
+        board = [[None for _ in range(cols)] for _ in range(rows)]
+        for name, color, r, c, stats in placements:
+            p = Piece(name, color, r, c)
+            if stats:
+                try:
+                    p.hp = int(stats[0])
+                    for flag in stats[1:]:
+                        if flag == 'a': p.first_attack = False
+                        elif flag[0] == 'r': p.dmg_reduction = int(flag[1:])
+                        elif flag[0] == 'c': p.special_cooldown = int(flag[1:])
+                        else: raise ValueError(flag)
+                except (ValueError, IndexError):
+                    raise ValueError(f"잘못된 스탯 표기: [{','.join(stats)}]") from None
+                # 실제 게임에서 나올 수 없는 상태 (HP 0 이하 기물은 apply_rules 가 보드에서 제거)
+                if not 0 < p.hp <= p.max_hp:
+                    raise ValueError(f"{p.name} 의 HP 는 1~{p.max_hp} 이어야 합니다: [{','.join(stats)}]")
+                if name != 'Queen' and any(flag[0] == 'c' for flag in stats[1:]):
+                    raise ValueError(f"쿨타임(c)은 퀸에만 쓸 수 있습니다: {Piece.SYMBOLS[name]}[{','.join(stats)}]")
+                if p.dmg_reduction < 0 or not 0 <= p.special_cooldown <= p.special_cooldown_max:
+                    raise ValueError(f"데미지 감소와 쿨타임은 음수일 수 없고 쿨타임은 최대 {p.special_cooldown_max} 입니다: [{','.join(stats)}]")
+            board[r][c] = p
+        return cls(win, rows, cols, board, 'white' if fields[1] == 'w' else 'black', eval_weights)
+
+    def square_name(self, r, c):
+        # 대수 기보식 칸 이름 (a1 = 백색 쪽 왼쪽 아래)
+        return f'{chr(ord("a") + c)}{self.rows - r}'
+
+    def move_name(self, piece_pos, move):
+        # 출발 칸 + 도착 칸 (예: "e2e4")
+        return self.square_name(*piece_pos) + self.square_name(*move)
+
+    # --- 되돌리기/다시 하기 (History 스냅샷으로 바로 이동, 수를 다시 두지 않음) ---
+    def restore(self, snapshot):
+        rows, turn, winner = snapshot
+        self.board = [[None for _ in range(self.cols)] for _ in range(self.rows)]
+        for r, row in enumerate(rows):
+            for c, state in enumerate(row):
+                if state is None: continue
+                p = Piece(state[0], state[1], r, c)
+                p.hp, p.dmg_reduction, p.special_cooldown, p.first_attack = state[2:]
+                self.board[r][c] = p
+        self.turn = turn
+        self.winner = winner
+        self.selected_piece = None
+        self.valid_moves = []
+        self.timeline.clear()
+        for attack_map in self.attack_maps.values():
+            attack_map.rebuild(self, self.board)
+
+    def seek(self, ply):
+        # ply 번째 기록 국면으로 이동 (애니메이션 중이거나 범위 밖이면 무시). 이동했으면 True
+        if self.is_animating or not 0 <= ply < len(self.history.snapshots) or ply == self.history.cursor:
+            return False
+        self.restore(self.history.seek(ply))
+        return True
+
+    def undo(self, turn=None):
+        # 이전 국면으로. turn 을 주면 그 진영이 둘 차례인 가장 가까운 이전 국면으로 (없으면 시작 국면)
+        ply = self.history.cursor - 1
+        if turn:
+            while ply > 0 and self.history.snapshots[ply][1] != turn: ply -= 1
+        return self.seek(ply)
+
+    def redo(self, turn=None):
+        # 다음 국면으로. turn 을 주면 그 진영이 둘 차례인 가장 가까운 다음 국면으로 (없으면 마지막 국면)
+        ply = self.history.cursor + 1
+        last = len(self.history.snapshots) - 1
+        if turn:
+            while ply < last and self.history.snapshots[ply][1] != turn: ply += 1
+        return self.seek(ply)
 
     def change_turn(self):
         self.turn = 'black' if self.turn == 'white' else 'white'
-        
+        self.decay_cooldowns(self.board)
+        print(f"Turn: {self.turn}")
+
+    def decay_cooldowns(self, board):
         # 쿨타임 감소: 턴이 바뀔 때마다 모든 퀸의 쿨타임이 1씩 감소
-        for r in range(ROWS):
-            for c in range(COLS):
-                p = self.board[r][c]
+        for row in board:
+            for p in row:
                 if p and p.name == 'Queen' and p.special_cooldown > 0:
                     p.special_cooldown -= 1
-        print(f"Turn: {self.turn}")
         
     # --- 화면 표시시 ---
     def draw(self):
         self.win.fill((0,0,0))
-        for r in range(ROWS):
-            for c in range(COLS):
+        for r in range(self.rows):
+            for c in range(self.cols):
                 color = WHITE_COLOR if (r+c)%2 == 0 else BLACK_COLOR
                 # 체스 보드 영역 (BOARD_SIZE x BOARD_SIZE)만 그림
-                pygame.draw.rect(self.win, color, (c*SQUARE_SIZE, r*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                pygame.draw.rect(self.win, color, (c*self.square_size, r*self.square_size, self.square_size, self.square_size))
         
         # 이동 가능 위치 하이라이트
         if self.selected_piece:
-            s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
+            s = pygame.Surface((self.square_size, self.square_size))
             s.set_alpha(100)
             s.fill(BLUE)
-            self.win.blit(s, (self.selected_piece.col*SQUARE_SIZE, self.selected_piece.row*SQUARE_SIZE))
+            self.win.blit(s, (self.selected_piece.col*self.square_size, self.selected_piece.row*self.square_size))
             
+            lethal_squares = self.get_lethal_squares(self.selected_piece)
             for r, c in self.valid_moves:
-                pygame.draw.circle(self.win, (0, 255, 0), 
-                                   (c*SQUARE_SIZE + SQUARE_SIZE//2, r*SQUARE_SIZE + SQUARE_SIZE//2), 10)
+                # 이동하면 상대의 다음 공격에 죽는 칸은 빨간색으로 표시
+                dot_color = RED if (r, c) in lethal_squares else (0, 255, 0)
+                pygame.draw.circle(self.win, dot_color, 
+                                   (c*self.square_size + self.square_size//2, r*self.square_size + self.square_size//2), 10)
+
+        # 상대의 다음 공격에 죽을 수 있는 플레이어 기물 테두리 표시
+        if not self.is_animating and self.winner is None:
+            for p in self.get_threatened_pieces('white'):
+                pygame.draw.rect(self.win, RED, (p.col*self.square_size, p.row*self.square_size, self.square_size, self.square_size), 3)
 
         # 애니매이션이 없는 기물 표시
-        animating_pieces = []
-        if self.is_animating:
-            animating_pieces.append(self.animation_piece)
-            target = self.pending_move_data.get('target_piece')
-            behind_target = self.pending_move_data.get('behind_target')
-            
-            if target and target.color != self.animation_piece.color:
-                animating_pieces.append(target)
-            if behind_target and behind_target.color != self.animation_piece.color:
-                animating_pieces.append(behind_target)
+        now = pygame.time.get_ticks()
+        animating_pieces = self.timeline.hidden_pieces(now)
                 
-        for r in range(ROWS):
-            for c in range(COLS):
+        for r in range(self.rows):
+            for c in range(self.cols):
                 p = self.board[r][c]
                 if p and p not in animating_pieces:
-                    p.draw(self.win)
+                    p.draw(self.win, self.square_size)
         
-        # 데미지 표시
-        self.draw_damage_display()
-        
-        # 애니매이션 기물과 공격당하는 대상 표시
-        if self.is_animating:
-            self.draw_attack_animation()
+        # 타임라인의 트윈 표시 (공격/이동 애니메이션, 관통 효과, 데미지 숫자)
+        self.timeline.draw(now)
             
         # 퀸의 관통 공격 쿨타임 표시시
         self.draw_cooldown_display()
@@ -558,25 +1395,24 @@ class Game:
             
             self.win.blit(text, text_rect)
         
+        # 수 기록 스크럽 바 (게임이 끝난 뒤에도 되돌려 볼 수 있도록 마지막에 그림)
+        self.draw_history_bar()
+        
         pygame.display.update()
 
-    def draw_attack_animation(self):
-        elapsed = pygame.time.get_ticks() - self.animation_start_time
-        progress = min(1.0, elapsed / self.animation_duration)
+    def draw_attack_animation(self, data, progress):
+        start_r, start_c = data['start_pos']
+        target_r, target_c = data['target_r'], data['target_c']
+        piece = data['piece']
         
-        start_r, start_c = self.animation_start_pos
-        target_r, target_c = self.animation_target_pos
-        piece = self.animation_piece
-        target = self.pending_move_data.get('target_piece')
-        
-        start_x = start_c * SQUARE_SIZE + SQUARE_SIZE // 2
-        start_y = start_r * SQUARE_SIZE + SQUARE_SIZE // 2
-        target_x = target_c * SQUARE_SIZE + SQUARE_SIZE // 2
-        target_y = target_r * SQUARE_SIZE + SQUARE_SIZE // 2
+        start_x = start_c * self.square_size + self.square_size // 2
+        start_y = start_r * self.square_size + self.square_size // 2
+        target_x = target_c * self.square_size + self.square_size // 2
+        target_y = target_r * self.square_size + self.square_size // 2
         
         current_x, current_y = start_x, start_y
         
-        if target and target.color != piece.color and target.hp > 0:
+        if data['target_survives']:
             # 공격 후 복귀 애니메이션
             if progress < 0.5: # 공격
                 interp = progress * 2
@@ -586,77 +1422,80 @@ class Game:
                 interp = (progress - 0.5) * 2
                 current_x = target_x + (start_x - target_x) * interp
                 current_y = target_y + (start_y - target_y) * interp
-                
-            # 공격 대상 기물 그리기
-            target_piece_at_target_pos = self.board[target_r][target_c]
-            if target_piece_at_target_pos:
-                 target_piece_at_target_pos.draw(self.win)
             
         else:  
-            # 단순 이동 또는 공격 후 타겟 사망 (목표 칸으로 이동)
+            # 공격 후 타겟 사망 (목표 칸으로 이동)
             current_x = start_x + (target_x - start_x) * progress
             current_y = start_y + (target_y - start_y) * progress
             
         # 공격 기물 그리기
         self._draw_piece_at_pos(piece, current_x, current_y)
 
+    def draw_slide(self, piece, start, target, progress):
+        # 단순 이동 애니메이션
+        start_x = start[1] * self.square_size + self.square_size // 2
+        start_y = start[0] * self.square_size + self.square_size // 2
+        target_x = target[1] * self.square_size + self.square_size // 2
+        target_y = target[0] * self.square_size + self.square_size // 2
+        self._draw_piece_at_pos(piece, start_x + (target_x - start_x) * progress, start_y + (target_y - start_y) * progress)
+
+    def draw_pierce(self, src, dst, progress):
+        # 퀸 관통 효과: 타겟 칸에서 뒤쪽 칸으로 뻗어 나가는 빨간 선
+        src_x = src[1] * self.square_size + self.square_size // 2
+        src_y = src[0] * self.square_size + self.square_size // 2
+        dst_x = dst[1] * self.square_size + self.square_size // 2
+        dst_y = dst[0] * self.square_size + self.square_size // 2
+        end = (src_x + (dst_x - src_x) * progress, src_y + (dst_y - src_y) * progress)
+        pygame.draw.line(self.win, RED, (src_x, src_y), end, 6)
 
     def _draw_piece_at_pos(self, piece, x, y):
         # 주어진 픽셀 위치 (x, y)에 기물을 그리는 헬퍼 함수
         
         # 기물 이미지 그리기
-        if piece.image:
-            draw_x = int(x) - SQUARE_SIZE // 2
-            draw_y = int(y) - SQUARE_SIZE // 2
-            self.win.blit(piece.image, (draw_x, draw_y))
+        image = piece.get_image(self.square_size)
+        if image:
+            draw_x = int(x) - self.square_size // 2
+            draw_y = int(y) - self.square_size // 2
+            self.win.blit(image, (draw_x, draw_y))
         else:
             # 이미지 없을 경우 대체 원형 표시
             pass 
 
         # 스탯 표시 (애니메이션 중에도 스탯이 따라다니도록)
-        stat_font = pygame.font.SysFont('arial', 20, bold=True)
+        font_size = max(10, self.square_size * 2 // 9)
+        stat_font = pygame.font.SysFont('arial', font_size, bold=True)
         
         # HP: Left bottom 
         hp_text = stat_font.render(str(piece.hp), True, GREEN)
-        hp_x = int(x) - SQUARE_SIZE // 2 + 5
-        hp_y = int(y) + SQUARE_SIZE // 2 - 25
+        hp_x = int(x) - self.square_size // 2 + 5
+        hp_y = int(y) + self.square_size // 2 - font_size - 5
         self.win.blit(hp_text, (hp_x, hp_y))
         
         # AP: Right bottom
         ap_text = stat_font.render(str(piece.ap), True, RED)
-        ap_rect = ap_text.get_rect(topright=(int(x) + SQUARE_SIZE // 2 - 5, int(y) + SQUARE_SIZE // 2 - 25))
+        ap_rect = ap_text.get_rect(topright=(int(x) + self.square_size // 2 - 5, int(y) + self.square_size // 2 - font_size - 5))
         self.win.blit(ap_text, ap_rect)
 
-    def draw_damage_display(self):
-        now = pygame.time.get_ticks()
-        damage_font = pygame.font.SysFont('malgungothic', 40, bold=True)
-        
-        new_displays = []
-        for r, c, dmg, start_time in self.damage_displays:
-            elapsed = now - start_time
-            if elapsed < 1000: # 1초간 표시
-                progress = elapsed / 1000.0
-                
-                # Fade out (투명도)
-                alpha = int(255 * (1.0 - progress))
-                
-                # Move up (40 픽셀 위로 이동)
-                offset_y = int(progress * -40) 
-                
-                # 위치 (타겟 칸 중앙)
-                center_x = c * SQUARE_SIZE + SQUARE_SIZE // 2
-                center_y = r * SQUARE_SIZE + SQUARE_SIZE // 2
-                
-                # 텍스트 렌더링
-                text_surface = damage_font.render(str(abs(dmg)), True, RED)
-                text_surface.set_alpha(alpha)
-                
-                text_rect = text_surface.get_rect(center=(center_x, center_y + offset_y))
-                self.win.blit(text_surface, text_rect)
-                
-                new_displays.append((r, c, dmg, start_time))
+    def add_damage_display(self, r, c, dmg, start_time):
+        # 데미지 숫자 표시 (1초간 위로 떠오르며 사라짐)
+        cache = {}
+        def draw(progress):
+            # 텍스트는 처음 그릴 때 한 번만 렌더링
+            if 'surface' not in cache:
+                damage_font = pygame.font.SysFont('malgungothic', max(16, self.square_size * 4 // 9), bold=True)
+                cache['surface'] = damage_font.render(str(abs(dmg)), True, RED)
+            text_surface = cache['surface']
+            
+            # Fade out (투명도)
+            text_surface.set_alpha(int(255 * (1.0 - progress)))
             
-        self.damage_displays = new_displays
+            # Move up (40 픽셀 위로 이동), 위치 (타겟 칸 중앙)
+            center_x = c * self.square_size + self.square_size // 2
+            center_y = r * self.square_size + self.square_size // 2 + int(progress * -40)
+            
+            text_rect = text_surface.get_rect(center=(center_x, center_y))
+            self.win.blit(text_surface, text_rect)
+        self.timeline.add(Tween(start_time, self.damage_display_duration, draw))
         
     def draw_cooldown_display(self):
         cooldown_font = pygame.font.SysFont('malgungothic', 24, bold=True)
@@ -670,8 +1509,8 @@ class Game:
         y_start += line_height * 1.5
         
         queen_count = 0
-        for r in range(ROWS):
-            for c in range(COLS):
+        for r in range(self.rows):
+            for c in range(self.cols):
                 p = self.board[r][c]
                 if p and p.name == 'Queen':
                     queen_count += 1
@@ -687,6 +1526,32 @@ class Game:
             self.win.blit(cooldown_font.render("퀸 없음", True, (150, 150, 150)), (x_offset, y_start))
 
 
+    def history_bar_rect(self):
+        # 오른쪽 패널 아래쪽의 스크럽 바 영역
+        return pygame.Rect(BOARD_SIZE + 20, DISPLAY_HEIGHT - 50, DISPLAY_WIDTH - BOARD_SIZE - 40, 16)
+
+    def ply_at(self, x):
+        # 스크럽 바의 x 좌표에 해당하는 기록 번호
+        rect = self.history_bar_rect()
+        last = len(self.history.snapshots) - 1
+        return round(min(max((x - rect.x) / rect.width, 0), 1) * last)
+
+    def draw_history_bar(self):
+        font = pygame.font.SysFont('malgungothic', 18, bold=True)
+        rect = self.history_bar_rect()
+        last = len(self.history.snapshots) - 1
+        cursor = self.history.cursor
+        
+        self.win.blit(font.render(f"기록: {cursor} / {last} 수", True, (255, 255, 255)), (rect.x, rect.y - 55))
+        self.win.blit(font.render("←/→: 되돌리기/다시 하기", True, (150, 150, 150)), (rect.x, rect.y - 30))
+        
+        # 트랙, 현재 위치까지 채운 부분, 손잡이
+        handle_x = rect.x + (rect.width * cursor // last if last else 0)
+        pygame.draw.rect(self.win, (80, 80, 80), rect, border_radius=8)
+        pygame.draw.rect(self.win, BLUE, (rect.x, rect.y, handle_x - rect.x, rect.height), border_radius=8)
+        pygame.draw.circle(self.win, (255, 255, 255), (handle_x, rect.centery), rect.height // 2 + 3)
+
+
 # --- 초기화면 관련 함수 (배경 이미지 로드 추가) ---
 def draw_start_screen(win):
     """시작 화면을 그리고 '게임 시작' 버튼 영역을 반환합니다."""
@@ -743,61 +1608,105 @@ def draw_start_screen(win):
     return button_rect
 
 
-def main():
+def main(rows=ROWS, cols=COLS, ai_engine='minimax', mcts_time=1000, trace_path=None):
     win = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
     pygame.display.set_caption("Chess RPG with Special Abilities")
     clock = pygame.time.Clock()
+    pygame.event.set_blocked(pygame.MOUSEMOTION) # 마우스 이동만으로는 깨어나지 않음
     
-    # 메인 메뉴 루프
+    # 메인 메뉴 루프 (이벤트가 있을 때만 다시 그림)
     in_menu = True
+    start_button_rect = draw_start_screen(win) # 시작 화면 그리기 및 버튼 위치 반환
     while in_menu:
-        clock.tick(60)
-        start_button_rect = draw_start_screen(win) # 시작 화면 그리기 및 버튼 위치 반환
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                # '게임 시작' 버튼 클릭 확인
-                if start_button_rect.collidepoint(pos):
-                    in_menu = False # 메뉴 종료, 게임 루프로 진입
-                    print("Game Starting...")
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            pos = pygame.mouse.get_pos()
+            # '게임 시작' 버튼 클릭 확인
+            if start_button_rect.collidepoint(pos):
+                in_menu = False # 메뉴 종료, 게임 루프로 진입
+                print("Game Starting...")
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            start_button_rect = draw_start_screen(win)
                     
     # 게임 플레이 루프
-    game = Game(win) # 버튼 클릭 후 게임 객체 생성
+    # 애니메이션이 있을 때만 60fps 로 그리고, 없으면 pygame.event.wait 로 다음 입력/타이머까지 대기
+    game = Game(win, rows, cols) # 버튼 클릭 후 게임 객체 생성
+    game.ai_engine = ai_engine
+    game.mcts = MCTS(game, time_limit=mcts_time)
+    if trace_path: game.trace = SearchTrace(trace_path)
+    ai_pending = False
+    scrubbing = False # 스크럽 바를 드래그하는 중 (이때만 MOUSEMOTION 이벤트를 받음)
     run = True
+    dirty = True
     while run:
-        clock.tick(60)
+        # 애니메이션 진행 및 완료 처리 (트윈이 끝났으면 대기하기 전에 결과 국면을 한 번 그림)
+        if game.timeline.update(pygame.time.get_ticks()):
+            dirty = True
         
-        now = pygame.time.get_ticks()
+        # AI 차례: 0.5초 뒤에 AI_MOVE_EVENT 가 오도록 타이머 설정 (지난 수를 보고 있을 때는 두지 않음)
+        if game.turn == 'black' and game.winner is None and not game.is_animating and not ai_pending and game.history.at_end:
+            pygame.time.set_timer(AI_MOVE_EVENT, 500, 1)
+            ai_pending = True
         
-        # 애니메이션 완성도 확인
-        if game.is_animating:
-            if now - game.animation_start_time >= game.animation_duration:
-                game.complete_move_after_animation()
+        if dirty or game.timeline.active:
             game.draw()
-            continue
+            dirty = False
         
-        # AI 차례
-        if game.turn == 'black' and game.winner is None:
-            pygame.time.delay(500)
-            game.ai_move_minimax()
-            continue 
+        if game.timeline.active:
+            clock.tick(60)
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait()] + pygame.event.get()
         
         # 플레이어 차례와 이벤트 관리
-        for event in pygame.event.get():
+        for event in events:
+            dirty = True
             if event.type == pygame.QUIT:
                 run = False
             
-            if event.type == pygame.MOUSEBUTTONDOWN and game.turn == 'white' and game.winner is None:
+            if event.type == AI_MOVE_EVENT:
+                ai_pending = False
+                if game.turn == 'black' and game.winner is None and game.history.at_end:
+                    game.ai_move()
+            
+            # 되돌리기/다시 하기: ←/→ (또는 Ctrl+Z/Ctrl+Y), 처음/마지막: Home/End
+            # 플레이어(백) 차례인 국면 사이를 이동 (지난 흑 차례 국면에서는 AI 도 플레이어도 둘 수 없으므로)
+            if event.type == pygame.KEYDOWN:
+                ctrl = event.mod & pygame.KMOD_CTRL
+                if event.key == pygame.K_LEFT or (ctrl and event.key == pygame.K_z):
+                    game.undo('white')
+                elif event.key == pygame.K_RIGHT or (ctrl and event.key == pygame.K_y):
+                    game.redo('white')
+                elif event.key == pygame.K_HOME:
+                    game.seek(0)
+                elif event.key == pygame.K_END:
+                    game.seek(len(game.history.snapshots) - 1)
+            
+            # 스크럽 바 클릭/드래그로 원하는 수로 이동
+            if event.type == pygame.MOUSEBUTTONDOWN and game.history_bar_rect().inflate(20, 20).collidepoint(event.pos):
+                scrubbing = True
+                pygame.event.set_allowed(pygame.MOUSEMOTION)
+                game.seek(game.ply_at(event.pos[0]))
+                continue
+            if event.type == pygame.MOUSEMOTION and scrubbing:
+                game.seek(game.ply_at(event.pos[0]))
+            if event.type == pygame.MOUSEBUTTONUP and scrubbing:
+                scrubbing = False
+                pygame.event.set_blocked(pygame.MOUSEMOTION)
+                # 지난 흑 차례 국면에서 놓으면 이어서 둘 수 있도록 직전 백 차례 국면으로
+                if game.turn != 'white' and game.winner is None and not game.history.at_end:
+                    game.undo('white')
+            
+            if event.type == pygame.MOUSEBUTTONDOWN and game.turn == 'white' and game.winner is None and not game.is_animating:
                 pos = pygame.mouse.get_pos()
-                r, c = pos[1]//SQUARE_SIZE, pos[0]//SQUARE_SIZE
+                r, c = pos[1]//game.square_size, pos[0]//game.square_size
                 
                 # 마우스 클릭이 보드 영역 안인지 확인
-                if c < COLS:
+                if r < game.rows and c < game.cols:
                     clicked_piece = game.board[r][c]
                     
                     if game.selected_piece:
@@ -806,20 +1715,36 @@ def main():
                         else:
                             if clicked_piece and clicked_piece.color == 'white':
                                 game.selected_piece = clicked_piece
-                                game.valid_moves = game.get_valid_moves(game.selected_piece)
+                                game.valid_moves = game.get_piece_moves(game.selected_piece)
                             else:
                                 game.selected_piece = None
                                 game.valid_moves = []
                     else:
                         if clicked_piece and clicked_piece.color == 'white':
                             game.selected_piece = clicked_piece
-                            game.valid_moves = game.get_valid_moves(game.selected_piece)
-
-        game.draw()
+                            game.valid_moves = game.get_piece_moves(game.selected_piece)
+    
+    # AI 탐색 기록 저장
+    if game.trace:
+        trace_file, folded_file = game.trace.close()
+        print(f"탐색 기록 저장: {trace_file}, {folded_file} ({game.trace.decisions}수)")
     
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-
-    main()
+    # 보드 크기와 AI 엔진 지정 (예: python chess_source_code.py --rows 10 --cols 10 --ai mcts)
+    import argparse
+    parser = argparse.ArgumentParser(description="Chess RPG with Special Abilities")
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--ai', choices=['minimax', 'mcts'], default='minimax', help="AI 엔진")
+    parser.add_argument('--mcts-time', type=int, default=1000, help="MCTS 한 수당 탐색 시간(ms)")
+    parser.add_argument('--trace', metavar='PATH', help="AI 탐색 기록을 PATH(Chrome trace JSON)와 .folded(flamegraph)로 저장")
+    args = parser.parse_args()
+    if args.rows < MIN_ROWS or args.cols < MIN_COLS:
+        parser.error(f"보드 크기는 최소 {MIN_ROWS}x{MIN_COLS} 이어야 합니다.")
+    if args.trace:
+        try: SearchTrace.folded_path_for(args.trace)
+        except ValueError as e: parser.error(str(e))
+    main(args.rows, args.cols, args.ai, args.mcts_time, args.trace)
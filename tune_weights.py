@@ -0,0 +1,318 @@
+"""체스 RPG 평가 가중치 튜닝 도구 (Texel 방식)
+
+1) generate: AI 끼리 자가 대국(self-play)을 두어 매 수 이후의 국면 특징과 최종 결과를
+   압축된 바이너리 데이터셋으로 스트리밍 저장합니다.
+2) fit: 데이터셋을 여러 프로세스에 나눠 올린 뒤, 로지스틱(시그모이드) 손실을 최소화하도록
+   evaluate_board 의 가중치를 맞추고 eval_weights.json 으로 저장합니다.
+   게임은 시작할 때 이 파일을 자동으로 불러옵니다.
+
+사용 예:
+    python tune_weights.py generate --games 2000 --out positions.bin
+    python tune_weights.py fit --data positions.bin --out eval_weights.json
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import operator
+import os
+import random
+import struct
+import time
+from array import array
+from itertools import repeat
+
+import chess_source_code as chess
+
+chess.setup_headless()  # 화면 없이 실행
+
+# --- 데이터셋 형식 ---
+# 헤더: MAGIC + 특징 개수(uint8)
+# 레코드: 위협받지 않는 기물 특징 8개, 위협받는 기물 특징 8개, 기동성 차이 (int16 x 17) + 결과(uint8)
+#   결과는 방금 수를 둔 진영 기준 0 = 패배, 1 = 무승부(수 제한 도달), 2 = 승리
+MAGIC = b'RPGT1'
+KEYS = chess.EVAL_FEATURE_KEYS
+NUM_FEATURES = len(KEYS) * 2 + 1
+RECORD = struct.Struct(f'<{NUM_FEATURES}hB')
+HEADER_SIZE = len(MAGIC) + 1
+
+# King 은 양쪽 모두 항상 보드에 있어 특징 값이 거의 변하지 않으므로 고정
+TUNABLE_KEYS = ['hp', 'ap', 'Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'threat', 'mobility']
+
+
+# --- 1. 자가 대국 데이터 생성 ---
+def play_game(args):
+    seed, max_plies, epsilon = args
+    rng = random.Random(seed)
+    random.seed(seed)  # AI 평가에 섞이는 노이즈
+    positions = []
+    with chess.quiet():
+        game = chess.Game(None)
+        for _ in range(max_plies):
+            if game.winner: break
+            color = game.turn
+            if rng.random() < epsilon:
+                # 국면 다양성을 위해 일정 확률로 무작위 수 (이때는 탐색하지 않음)
+                piece_pos, move = None, None
+                pieces = [p for row in game.board for p in row if p and p.color == color]
+                rng.shuffle(pieces)
+                for p in pieces:
+                    moves = game.get_piece_moves(p)
+                    if moves:
+                        piece_pos, move = (p.row, p.col), rng.choice(moves)
+                        break
+            else:
+                piece_pos, move, _ = game.find_best_move(color)
+            if move is None:
+                game.change_turn()
+                continue
+            game.apply_move(piece_pos, move)
+            plain, threatened, mobility = game.eval_features(game.board, game.attack_maps, color)
+            positions.append((plain + threatened + [mobility], color))
+
+    out = bytearray()
+    for features, color in positions:
+        result = 1 if game.winner is None else (2 if game.winner == color else 0)
+        out += RECORD.pack(*features, result)
+    return bytes(out)
+
+
+def generate(args):
+    seeds = [(args.seed + i, args.max_plies, args.epsilon) for i in range(args.games)]
+    start = time.time()
+    count = 0
+    mode = 'ab' if args.append and os.path.exists(args.out) else 'wb'
+    with open(args.out, mode) as f, mp.Pool(args.workers) as pool:
+        if mode == 'wb':
+            f.write(MAGIC + bytes([NUM_FEATURES]))
+        for i, blob in enumerate(pool.imap_unordered(play_game, seeds, chunksize=1), 1):
+            f.write(blob)
+            count += len(blob) // RECORD.size
+            if i % 50 == 0 or i == args.games:
+                elapsed = time.time() - start
+                print(f"games {i}/{args.games}  positions {count}  ({count / elapsed:.0f} pos/s)")
+        pool.close()
+        pool.join()
+    print(f"저장 완료: {args.out} ({count} positions, {time.time() - start:.1f}s)")
+
+
+# --- 2. 데이터셋 로드 (열 단위 배열) ---
+def count_records(path):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if header[:len(MAGIC)] != MAGIC or header[-1] != NUM_FEATURES:
+        raise ValueError(f"{path}: 지원하지 않는 데이터셋 형식입니다.")
+    return (os.path.getsize(path) - HEADER_SIZE) // RECORD.size
+
+
+def load_columns(path, start, stop, chunk=65536):
+    # [start, stop) 범위의 레코드를 특징별 array('d') 열과 정답(0/0.5/1) 열로 읽음
+    columns = [array('d') for _ in range(NUM_FEATURES)]
+    labels = array('d')
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE + start * RECORD.size)
+        remaining = stop - start
+        while remaining > 0:
+            n = min(chunk, remaining)
+            data = f.read(n * RECORD.size)
+            for record in RECORD.iter_unpack(data):
+                for col, value in zip(columns, record):
+                    col.append(value)
+                labels.append(record[-1] / 2)
+            remaining -= n
+    return columns, labels
+
+
+# --- 3. 배치 점수 계산과 손실/기울기 ---
+# 열 단위 배열에 map/operator 를 적용해 파이썬 루프 없이 배치 전체를 한 번에 계산
+def batch_scores(columns, weights):
+    n = len(columns[0])
+    k = len(KEYS)
+    keep = 1 - weights['threat']
+    scores = array('d', bytes(8 * n))
+    terms = [(columns[i], weights[key]) for i, key in enumerate(KEYS)]
+    terms += [(columns[k + i], weights[key] * keep) for i, key in enumerate(KEYS)]
+    terms.append((columns[2 * k], weights['mobility']))
+    for col, w in terms:
+        if w:
+            scores = array('d', map(operator.add, scores, map(operator.mul, repeat(w), col)))
+    return scores
+
+
+def sigmoid_batch(scores, scale):
+    # 1 / (1 + exp(-K * s)), 오버플로 방지를 위해 지수를 [-50, 50] 으로 제한
+    exponents = map(min, repeat(50.0), map(max, repeat(-50.0), map(operator.mul, repeat(-scale), scores)))
+    return array('d', map(operator.truediv, repeat(1.0), map(operator.add, repeat(1.0), map(math.exp, exponents))))
+
+
+def loss_and_grad(columns, labels, weights, scale, with_grad=True):
+    # 손실 = sum((sigmoid(K * s) - y)^2), 반환값은 합계이며 평균은 호출 측에서 계산
+    probs = sigmoid_batch(batch_scores(columns, weights), scale)
+    errors = array('d', map(operator.sub, probs, labels))
+    loss = math.fsum(map(operator.mul, errors, errors))
+    if not with_grad:
+        return loss, None
+
+    # dL/ds = 2 * (p - y) * p * (1 - p) * K
+    slopes = array('d', map(operator.mul, errors,
+                            map(operator.mul, probs, map(operator.sub, repeat(1.0), probs))))
+    k = len(KEYS)
+    keep = 1 - weights['threat']
+    factor = 2 * scale
+    grad = dict.fromkeys(TUNABLE_KEYS, 0.0)
+    threatened_score = 0.0
+    for i, key in enumerate(KEYS):
+        g_plain = math.fsum(map(operator.mul, slopes, columns[i]))
+        g_threat = math.fsum(map(operator.mul, slopes, columns[k + i]))
+        if key in grad:
+            grad[key] = factor * (g_plain + keep * g_threat)
+        threatened_score += weights[key] * g_threat
+    grad['threat'] = -factor * threatened_score
+    grad['mobility'] = factor * math.fsum(map(operator.mul, slopes, columns[2 * k]))
+    return loss, grad
+
+
+def feature_moments(columns):
+    # 가중치별로 곱해지는 특징(위협 여부와 무관한 기물 특징 합, 기동성)의 (합, 제곱합)
+    k = len(KEYS)
+    moments = {}
+    for i, key in enumerate(KEYS):
+        values = array('d', map(operator.add, columns[i], columns[k + i]))
+        moments[key] = (math.fsum(values), math.fsum(map(operator.mul, values, values)))
+    values = columns[2 * k]
+    moments['mobility'] = (math.fsum(values), math.fsum(map(operator.mul, values, values)))
+    return moments
+
+
+# --- 4. 병렬 작업자: 자기 몫의 데이터를 한 번만 읽고 요청마다 손실/기울기 계산 ---
+def shard_worker(conn, path, start, stop):
+    columns, labels = load_columns(path, start, stop)
+    conn.send((len(labels), feature_moments(columns)))
+    while True:
+        request = conn.recv()
+        if request is None: break
+        weights, scale, with_grad = request
+        conn.send(loss_and_grad(columns, labels, weights, scale, with_grad))
+    conn.close()
+
+
+class ShardPool:
+    def __init__(self, path, workers):
+        total = count_records(path)
+        if total == 0:
+            raise ValueError(f"{path}: 레코드가 없습니다.")
+        bounds = [total * i // workers for i in range(workers + 1)]
+        self.conns = []
+        self.procs = []
+        for start, stop in zip(bounds, bounds[1:]):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=shard_worker, args=(child, path, start, stop), daemon=True)
+            proc.start()
+            self.conns.append(parent)
+            self.procs.append(proc)
+        # 전체 데이터의 특징별 표준편차 (학습률 정규화용)
+        self.total = 0
+        sums = {}
+        for conn in self.conns:
+            count, moments = conn.recv()
+            self.total += count
+            for key, (s, sq) in moments.items():
+                total_s, total_sq = sums.get(key, (0.0, 0.0))
+                sums[key] = (total_s + s, total_sq + sq)
+        self.std = {key: math.sqrt(max(0.0, sq / self.total - (s / self.total) ** 2)) for key, (s, sq) in sums.items()}
+
+    def evaluate(self, weights, scale, with_grad=True):
+        for conn in self.conns:
+            conn.send((weights, scale, with_grad))
+        loss = 0.0
+        grad = dict.fromkeys(TUNABLE_KEYS, 0.0)
+        for conn in self.conns:
+            part_loss, part_grad = conn.recv()
+            loss += part_loss
+            if part_grad:
+                for key in grad: grad[key] += part_grad[key]
+        return loss / self.total, {key: g / self.total for key, g in grad.items()}
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+        for proc in self.procs:
+            proc.join()
+
+
+def fit_scale(pool, weights):
+    # 현재 가중치에서 손실이 가장 작은 시그모이드 배율 K 를 황금분할 탐색으로 찾음
+    lo, hi = 1e-4, 1.0
+    ratio = (math.sqrt(5) - 1) / 2
+    for _ in range(40):
+        a = hi - ratio * (hi - lo)
+        b = lo + ratio * (hi - lo)
+        if pool.evaluate(weights, a, False)[0] < pool.evaluate(weights, b, False)[0]: hi = b
+        else: lo = a
+    return (lo + hi) / 2
+
+
+def fit(args):
+    weights = chess.load_eval_weights(args.init) if args.init else dict(chess.DEFAULT_EVAL_WEIGHTS)
+    start = time.time()
+    pool = ShardPool(args.data, args.workers)
+    print(f"데이터 로드: {pool.total} positions, {args.workers} workers ({time.time() - start:.1f}s)")
+    try:
+        scale = fit_scale(pool, weights)
+        loss, _ = pool.evaluate(weights, scale, False)
+        print(f"K = {scale:.5f}, 초기 손실 = {loss:.6f}")
+
+        # Adam: 기울기 크기와 무관하게 한 번에 약 lr 만큼 움직이므로, 특징을 표준편차로 정규화한 것과 같도록
+        # 가중치별 학습률을 lr / max(1, 표준편차) 로 둠 (HP 합이나 기동성처럼 값이 큰 특징의 가중치가 튀지 않게)
+        # threat 는 특징이 아니라 [0, 1] 비율이므로 lr * 0.01
+        steps = {key: args.lr * (0.01 if key == 'threat' else 1 / max(1.0, pool.std[key])) for key in TUNABLE_KEYS}
+        m = dict.fromkeys(TUNABLE_KEYS, 0.0)
+        v = dict.fromkeys(TUNABLE_KEYS, 0.0)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for epoch in range(1, args.epochs + 1):
+            loss, grad = pool.evaluate(weights, scale)
+            for key in TUNABLE_KEYS:
+                m[key] = beta1 * m[key] + (1 - beta1) * grad[key]
+                v[key] = beta2 * v[key] + (1 - beta2) * grad[key] ** 2
+                m_hat = m[key] / (1 - beta1 ** epoch)
+                v_hat = v[key] / (1 - beta2 ** epoch)
+                weights[key] -= steps[key] * m_hat / (math.sqrt(v_hat) + eps)
+            weights['threat'] = min(1.0, max(0.0, weights['threat']))
+            if epoch % 25 == 0 or epoch == args.epochs:
+                print(f"epoch {epoch}: loss = {loss:.6f} ({time.time() - start:.1f}s)")
+    finally:
+        pool.close()
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({key: round(value, 4) for key, value in weights.items()}, f, indent=2)
+    print(f"가중치 저장: {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="체스 RPG 평가 가중치 튜닝 (Texel 방식)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="자가 대국으로 학습 국면 생성")
+    gen.add_argument('--games', type=int, default=1000)
+    gen.add_argument('--out', default='positions.bin')
+    gen.add_argument('--append', action='store_true', help="기존 데이터셋 뒤에 이어서 저장")
+    gen.add_argument('--workers', type=int, default=os.cpu_count())
+    gen.add_argument('--max-plies', type=int, default=200)
+    gen.add_argument('--epsilon', type=float, default=0.1, help="무작위 수를 둘 확률")
+    gen.add_argument('--seed', type=int, default=0)
+
+    fit_parser = sub.add_parser('fit', help="데이터셋으로 가중치 튜닝")
+    fit_parser.add_argument('--data', default='positions.bin')
+    fit_parser.add_argument('--out', default=chess.EVAL_WEIGHTS_PATH)
+    fit_parser.add_argument('--init', help="시작 가중치 파일 (기본값: 코드의 기본 가중치)")
+    fit_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    fit_parser.add_argument('--epochs', type=int, default=300)
+    fit_parser.add_argument('--lr', type=float, default=0.05, help="학습률 (가중치별로 특징의 표준편차로 나눠 적용)")
+
+    args = parser.parse_args()
+    if args.command == 'generate': generate(args)
+    else: fit(args)
+
+
+if __name__ == "__main__":
+    main()